@@ -17,36 +17,77 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import io
+import json
 import multiprocessing as mp
 import random
+import re
 from numpy.typing import NDArray
 import numpy as np
 import os
+import queue
 import math
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
 import exifread
 import tarfile
 import cloud_storage
-import cloud_run_jobs
+import dispatch
 import env
+import metrics
+import thinning
+import match_pairs
+import quicklook
+import working_images
+from spool import Spool, SpoolDir
+from image_cache import ImageCache
 
 from tempfile import mkdtemp
+from collections import deque
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
 from tempfile import mkstemp
 
 
-def debug(msg: str):
+def debug(msg: str, *args) -> None:
+    """Logs msg % args at DEBUG level. Pass arguments rather than an f-string so
+    that nothing is formatted unless LOG_LEVEL=DEBUG"""
+    if not env.DEBUG:
+        return
+    if args:
+        msg = msg % args
     print(f'{{"severity": "DEBUG", "message": "{msg}"}}')
 
 
+EXIF_SECONDS = metrics.histogram("batcher_exif_seconds", "Time to parse an image's EXIF")
+SAVE_IMAGE_SECONDS = metrics.histogram("batcher_save_image_seconds", "Time to archive an image to the bucket")
+CHECK_FOR_ORBIT_SECONDS = metrics.histogram("batcher_check_for_orbit_seconds",
+                                            "Time to check for a closed orbit, including assembling its dataset")
+ASSEMBLE_DATASET_SECONDS = metrics.histogram("batcher_assemble_dataset_seconds",
+                                             "Time to pack, upload and dispatch a dataset")
+
+
+image_cache = ImageCache(int(env.IMAGE_CACHE_MB * 1024 * 1024))
+# Quick-looks run one at a time, off the track threads
+quicklook_executor = ThreadPoolExecutor(max_workers=1)
+quicklook_lock = threading.Lock()
+quicklooks_pending = 0
+
+
 class PhotoInfo:
     def __init__(self, filename: str) -> None:
         self.filename = filename
-        with open(filename, 'rb') as f:
+        self.storage_name = None
+        self.working = None
+        with EXIF_SECONDS.time(), open(filename, 'rb') as f:
             tags = exifread.process_file(f, details=False, extract_thumbnail=False)
 
         self.lat = None
         self.lon = None
+        self.alt = None
         self.t_utc = None
         self.v = None
         self.dir = None
@@ -59,6 +100,13 @@ class PhotoInfo:
         except KeyError:
             pass
 
+        try:
+            self.alt = self.float_value(tags['GPS GPSAltitude'])
+            if 'GPS GPSAltitudeRef' in tags and tags['GPS GPSAltitudeRef'].values[0] == 1:
+                self.alt = -self.alt
+        except KeyError:
+            pass
+
         try:
             str_time = tags['EXIF DateTimeOriginal'].values
             utc_time = datetime.strptime(str_time, "%Y:%m:%d %H:%M:%S")
@@ -66,6 +114,13 @@ class PhotoInfo:
         except KeyError:
             pass
 
+        try:
+            subsec = str(tags['EXIF SubSecTimeOriginal'].values).strip()
+            if self.t_utc is not None and subsec.isdigit():
+                self.t_utc += float("0." + subsec)
+        except KeyError:
+            pass
+
         try:
             self.serial_number = tags['EXIF BodySerialNumber'].values
         except KeyError:
@@ -86,6 +141,47 @@ class PhotoInfo:
         except KeyError:
             pass
 
+    def to_record(self) -> dict:
+        return {"filename": self.filename,
+                "storage_name": self.storage_name,
+                "lat": self.lat,
+                "lon": self.lon,
+                "alt": self.alt,
+                "t_utc": self.t_utc,
+                "v": None if self.v is None else self.v.tolist(),
+                "groundspeed": self.groundspeed,
+                "serial_number": self.serial_number}
+
+    @classmethod
+    def from_record(cls, record: dict) -> "PhotoInfo":
+        """Restores a PhotoInfo from a spool record without re-reading the image"""
+        photo = cls.__new__(cls)
+        photo.filename = record["filename"]
+        photo.storage_name = record["storage_name"]
+        photo.working = None
+        photo.lat = record["lat"]
+        photo.lon = record["lon"]
+        photo.alt = record.get("alt")
+        photo.t_utc = record["t_utc"]
+        photo.groundspeed = record["groundspeed"]
+        photo.serial_number = record["serial_number"]
+        photo.v = None
+        photo.dir = None
+        if record["v"] is not None:
+            photo.v = np.array(record["v"])
+            photo.dir = photo.v / np.linalg.norm(photo.v)
+        return photo
+
+    def metadata(self) -> dict:
+        """Fields shipped in the dataset so the mosaic job doesn't have to parse EXIF again"""
+        return {"latitude": self.lat,
+                "longitude": self.lon,
+                "altitude": self.alt,
+                "utc_time": self.t_utc,  # Including SubSecTimeOriginal
+                "serial_number": self.serial_number,
+                "groundspeed": self.groundspeed,
+                "track": None if self.dir is None else math.degrees(math.atan2(self.dir[1], self.dir[0])) % 360}
+
     def dms_to_decimal(self, dms, sign):
         """Converts dms coords to decimal degrees"""
         degrees, minutes, seconds = self.float_values(dms)
@@ -160,33 +256,179 @@ def get_dataset_name(photos: list[PhotoInfo]) -> str:
     return f"datasets/{date_path}/{time_str}_{lat:.5f}_{lon:.5f}.tar"
 
 
-def save_image(image: PhotoInfo):
+@SAVE_IMAGE_SECONDS.time()
+def save_image(image: PhotoInfo) -> str | None:
     debug("Saving image...")
     bucket = get_bucket_name(image)
     for i in range(65536):
         dest = get_storage_name(image, i)
         try:
             cloud_storage.upload(bucket, image.filename, dest)
-            debug(f"...saved image {image.filename} to {bucket} as {dest}")
-            return
+            debug("...saved image %s to %s as %s", image.filename, bucket, dest)
+            return dest
         except FileExistsError as e:
             print(f"failed to upload {image.filename} to {bucket} as {dest}: {e}")
 
     print(f"failed to save {image.filename} to {bucket}: could not find a filename that doesn't already exist")
+    return None
 
 
-class Batcher:
-    def __init__(self) -> None:
+def fetch_image(photo: PhotoInfo) -> None:
+    """Pins photo's local file, first downloading the archived copy if it is gone, e.g. after a restart or eviction"""
+    if image_cache.pin(photo.filename):
+        return
+    photo.filename = download_image(photo)
+
+
+def download_image(photo: PhotoInfo) -> str:
+    """Downloads the archived copy of photo to a new, pinned local file"""
+    debug("Fetching %s for missing %s...", photo.storage_name, photo.filename)
+    data = cloud_storage.download(get_bucket_name(photo), photo.storage_name)
+    fd, filename = mkstemp("." + photo.filename.split('.')[-1])
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    image_cache.fetched(filename, pinned=True)
+    return filename
+
+
+def local_image(photo: PhotoInfo) -> str:
+    """Returns the local file to pack for photo, preferring its working image. The caller must unpin it"""
+    working = working_image(photo)
+    if working is not None:
+        return working
+    fetch_image(photo)
+    return photo.filename
+
+
+def prefetch_images(photos: list[PhotoInfo]):
+    """Yields (photo, local file) in order, fetching missing images a few photos ahead in parallel.
+
+    Each yielded file is pinned in the image cache; the caller must unpin it.
+    """
+    workers = cloud_storage.TRANSFER_WORKERS
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for photo in photos:
+                pending.append((photo, executor.submit(local_image, photo)))
+                if len(pending) > 2 * workers:
+                    photo, future = pending.popleft()
+                    yield photo, future.result()
+            while pending:
+                photo, future = pending.popleft()
+                yield photo, future.result()
+        finally:
+            # Fetched ahead but never handed out
+            for photo, future in pending:
+                if future.exception() is None:
+                    image_cache.unpin(future.result())
+
+
+def pin_local_image(photo: PhotoInfo) -> str | None:
+    """Pins whichever local file of photo is ready now, preferring its working image, without waiting"""
+    working = photo.working
+    if working is not None and working.done() and working.exception() is None and image_cache.pin(working.result()):
+        return working.result()
+    filename = photo.filename
+    return filename if image_cache.pin(filename) else None
+
+
+def start_quicklook(photos: list[PhotoInfo]) -> None:
+    """Makes the quick-look mosaic of a closed orbit in the background, alongside packing the dataset"""
+    global quicklooks_pending
+    # Pin now: the track deletes the orbit's local files once it is packed
+    images = [pin_local_image(photo) for photo in photos]
+    with quicklook_lock:
+        quicklooks_pending += 1
+    quicklook_executor.submit(quicklook_task, list(photos), images)
+
+
+def quicklook_task(photos: list[PhotoInfo], images: list[str | None]) -> None:
+    global quicklooks_pending
+    downloaded = []
+    try:
+        for i, photo in enumerate(photos):
+            if images[i] is None:
+                images[i] = download_image(photo)
+                downloaded.append(images[i])
+        bucket_name = get_bucket_name(photos[0])
+        fd, quicklook_file = mkstemp(".tiff")
+        os.close(fd)
+        quicklook.make_quicklook(photos, images, quicklook_file, env.ALTITUDE_AGL_M, env.CAMERA_HFOV_DEG,
+                                 env.CAMERA_VFOV_DEG, env.QUICKLOOK_GSD_M)
+        quicklook_name = os.path.splitext(get_dataset_name(photos))[0] + "_quicklook.tiff"
+        cloud_storage.upload(bucket_name, quicklook_file, quicklook_name)
+        os.remove(quicklook_file)
+        print(f"Uploaded quick-look mosaic to {bucket_name} as {quicklook_name}")
+    except Exception as e:
+        print(f"Failed to make quick-look mosaic: {e}")
+    finally:
+        for image in images:
+            if image is not None:
+                image_cache.unpin(image)
+        for image in downloaded:
+            image_cache.remove(image)
+        with quicklook_lock:
+            quicklooks_pending -= 1
+
+
+def cache_working_image(future) -> None:
+    if future.exception() is None:
+        # Evictable: the original image is the fallback
+        image_cache.add(future.result(), archived=True)
+
+
+def working_image(photo: PhotoInfo) -> str | None:
+    """Returns the pre-decoded working image made for photo at ingest, pinned, if there is one"""
+    if photo.working is None:
+        return None
+    try:
+        filename = photo.working.result()
+    except Exception as e:
+        print(f"Failed to make working image for {photo.filename}: {e}")
+        return None
+    return filename if image_cache.pin(filename) else None
+
+
+def shard_for(serial_number: str | None, shard_count: int) -> int:
+    """Deterministically assigns an aircraft to one of shard_count Batcher instances"""
+    return zlib.crc32(str(serial_number).encode()) % shard_count
+
+
+def spool_name(serial_number: str | None) -> str:
+    """Name of the spool file holding an aircraft's open orbit"""
+    return re.sub(r"[^\w.-]", "_", str(serial_number)) + ".jsonl"
+
+
+class Track:
+    """Photos and orbit detection for a single aircraft"""
+
+    def __init__(self, batcher: "Batcher", serial_number: str | None) -> None:
+        self.batcher = batcher
+        self.serial_number = serial_number
         self.photos: list[PhotoInfo] = []
-        self.input_queue: mp.Queue[str] = mp.Queue(1024)
-        self.photo_queue: mp.Queue[PhotoInfo] = mp.Queue(1024)
-        self.executor = ThreadPoolExecutor()
-        self.input_future = self.executor.submit(self.input_task)
-        if env.SEGMENTATION:
-            self.photo_future = self.executor.submit(self.photo_task)
+        # Only ever used between threads. PhotoInfo holds the working image
+        # future, which a multiprocessing queue would fail to pickle.
+        self.photo_queue: queue.Queue[PhotoInfo] = queue.Queue(1024)
+        self.last_photo_time = 0.0
+        # One spool per aircraft, written only by this track's thread, so an
+        # orbit closing never rewrites another aircraft's (or shard's) photos
+        self.spool = None
+        if batcher.spools:
+            self.spool = batcher.spools.spool(spool_name(serial_number))
+        self.thread = threading.Thread(target=self.photo_task, daemon=True)
+
+    def has_pending_work(self) -> bool:
+        if not self.photo_queue.empty():
+            return True
+        # An aircraft that leaves without closing its orbit should not keep
+        # the instance alive forever
+        max_dataset_time = float(os.environ.get("MAX_DATASET_TIME_SECONDS", 300))
+        return len(self.photos) > 0 and time.time() - self.last_photo_time < max_dataset_time
 
+    @CHECK_FOR_ORBIT_SECONDS.time()
     def check_for_orbit(self) -> bool:
-        debug("Checking for orbit...")
+        debug("Checking for orbit of %s...", self.serial_number)
         photo = self.photos[-1]
 
         min_orbit_time = 2*math.pi*photo.groundspeed/9.81  # assume 45 deg max bank
@@ -204,8 +446,6 @@ class Batcher:
                     start_index = 0
                     print("Max orbit time elapsed!")
                     break
-                if photo.serial_number != other.serial_number:
-                    continue
                 if photo.t_utc - other.t_utc < min_orbit_time:
                     continue
                 if np.dot(photo.dir, other.dir) < 0.7:
@@ -225,10 +465,123 @@ class Batcher:
         photos = []
         for i in range(start_index, len(self.photos)):
             photos.append(self.photos[i])
+        if env.THINNING:
+            kept = thinning.thin(photos, env.ALTITUDE_AGL_M, env.CAMERA_HFOV_DEG, env.CAMERA_VFOV_DEG,
+                                 env.FORWARD_OVERLAP, env.SIDE_OVERLAP)
+            print(f"Thinned orbit from {len(photos)} to {len(kept)} photos")
+            photos = kept
+        if env.QUICKLOOK:
+            start_quicklook(photos)
         assemble_dataset(photos)
 
         return True
 
+    def photo_task(self) -> None:
+        print(f"Running photo task for {self.serial_number}")
+        while True:
+            debug("Waiting for photo from %s...", self.serial_number)
+            photo = self.photo_queue.get()
+            debug("...got photo %s", photo.filename)
+            try:
+                self.add_photo(photo)
+            except Exception as e:
+                # Keep the thread alive: a dead one would never drain its queue
+                print(f"Failed to process photo {photo.filename} from {self.serial_number}: {e}")
+                if photo in self.photos:
+                    self.photos.remove(photo)
+
+    def add_photo(self, photo: PhotoInfo) -> None:
+        self.photos.append(photo)
+        self.last_photo_time = time.time()
+        self.photos.sort(key=lambda x: x.t_utc)
+        if self.spool and photo.storage_name is not None:
+            self.spool.append(photo.to_record())
+        if self.check_for_orbit():
+            for photo in self.photos:
+                image_cache.remove(photo.filename)
+                if photo.working is not None and photo.working.done() and photo.working.exception() is None:
+                    image_cache.remove(photo.working.result())
+            self.photos = []
+            self.rewrite_spool()
+
+    def rewrite_spool(self) -> None:
+        if self.spool:
+            self.spool.rewrite([photo.to_record() for photo in self.photos])
+
+
+class Batcher:
+    def __init__(self) -> None:
+        self.tracks: dict[str | None, Track] = {}
+        self.tracks_lock = threading.Lock()
+        self.input_queue: mp.Queue[str] = mp.Queue(1024)
+        self.image_cache = image_cache
+        self.spools = None
+        if env.SEGMENTATION and env.SPOOL_PATH:
+            self.spools = SpoolDir(env.SPOOL_PATH, uuid.uuid4().hex)
+        self.executor = ThreadPoolExecutor()
+        self.decoder = None
+        if env.SEGMENTATION and env.WORKING_IMAGES:
+            # spawn rather than fork: this process is full of threads
+            self.decoder = ProcessPoolExecutor(mp_context=mp.get_context("spawn"))
+        self.input_futures = [self.executor.submit(self.input_task) for _ in range(env.INPUT_WORKERS)]
+        self.register_metrics()
+
+    def register_metrics(self) -> None:
+        metrics.gauge("batcher_input_queue_depth", "Uploaded images waiting to be parsed and archived",
+                      self.input_queue.qsize)
+        metrics.gauge("batcher_photo_queue_depth", "Parsed images waiting for orbit detection",
+                      lambda: sum(track.photo_queue.qsize() for track in self.get_tracks()))
+        metrics.gauge("batcher_buffered_photos", "Photos held for open orbits",
+                      lambda: sum(len(track.photos) for track in self.get_tracks()))
+        metrics.gauge("batcher_tmpfs_bytes", "Bytes used on the filesystem holding temporary files",
+                      lambda: shutil.disk_usage(tempfile.gettempdir()).used)
+        metrics.gauge("batcher_image_cache_bytes", "Bytes of images held locally by the image cache",
+                      lambda: self.image_cache.stats()["cached_bytes"])
+        metrics.gauge("batcher_pending_dispatches", "Groups of datasets waiting for a mosaic to be started",
+                      dispatch.pending)
+
+    def get_tracks(self) -> list[Track]:
+        with self.tracks_lock:
+            return list(self.tracks.values())
+
+    def get_track(self, serial_number: str | None) -> Track:
+        with self.tracks_lock:
+            track = self.tracks.get(serial_number)
+            if track is None:
+                track = Track(self, serial_number)
+                if self.spools:
+                    self.restore(track)
+                self.tracks[serial_number] = track
+                track.thread.start()
+            return track
+
+    def owns(self, serial_number: str | None) -> bool:
+        return shard_for(serial_number, env.SHARD_COUNT) == env.SHARD_INDEX
+
+    def restore(self, track: Track) -> None:
+        """Takes over the aircraft's open orbit from spools left by instances that are gone"""
+        for path in self.spools.orphans(spool_name(track.serial_number)):
+            # The same image uploaded twice is recorded twice
+            seen = {photo.storage_name for photo in track.photos}
+            photos = [PhotoInfo.from_record(record) for record in Spool(path).load()
+                      if record["storage_name"] not in seen and record["serial_number"] == track.serial_number
+                      and record["v"] is not None and record["groundspeed"] is not None]
+            track.photos.extend(photos)
+            track.photos.sort(key=lambda x: x.t_utc)
+            # Make the records ours before dropping the orphan
+            track.rewrite_spool()
+            os.remove(path)
+            print(f"Restored {len(photos)} photos from {path}")
+        if track.photos:
+            track.last_photo_time = time.time()
+
+    def has_pending_work(self) -> bool:
+        """True while images are queued or an orbit is still being collected"""
+        if not self.input_queue.empty() or dispatch.pending() > 0 or quicklooks_pending > 0:
+            return True
+        tracks = self.get_tracks()
+        return any(track.has_pending_work() for track in tracks)
+
     def on_new_file(self, filename: str) -> None:
         if filename.split('.')[-1] != "jxl":
             return
@@ -239,7 +592,7 @@ class Batcher:
             try:
                 debug("Waiting for input...")
                 filename = self.input_queue.get()
-                debug(f"...got input file: {filename}")
+                debug("...got input file: %s", filename)
                 try:
                     photo = PhotoInfo(filename)
                 except ValueError as e:
@@ -248,45 +601,45 @@ class Batcher:
                 if photo.t_utc is None:
                     print(f"Photo {filename} had no timestamp, discarding")
                     continue
-                save_image(photo)
-                if not env.SEGMENTATION:
-                    # Image is archived; with segmentation off nothing downstream
-                    # needs the local copy. Drop it so tmpfs (RAM-backed on Cloud
-                    # Run) does not fill up.
+                photo.storage_name = save_image(photo)
+                if not env.SEGMENTATION or not self.owns(photo.serial_number):
+                    # Image is archived; with segmentation off (or the aircraft
+                    # batched by another instance) nothing downstream needs the
+                    # local copy. Drop it so tmpfs (RAM-backed on Cloud Run)
+                    # does not fill up.
                     os.remove(filename)
                     continue
                 if photo.lat is None or photo.lon is None:
                     print(f"Photo {filename} had no position metadata, will not use for mosaic")
+                    os.remove(filename)
+                    continue
+                if photo.dir is None or photo.groundspeed is None:
+                    # Orbit detection needs the speed and track of every photo
+                    print(f"Photo {filename} had no speed or track metadata, will not use for mosaic")
+                    os.remove(filename)
                     continue
                 detect_features(filename)
-                debug(f"Pushing {filename} to photo queue...")
-                self.photo_queue.put(photo)
-                debug(f"...Pushed {filename} to photo queue")
+                image_cache.add(filename, archived=photo.storage_name is not None)
+                if self.decoder is not None:
+                    photo.working = self.decoder.submit(working_images.make_working_image, filename,
+                                                        env.WORKING_IMAGE_MAX_SIZE, env.WORKING_IMAGE_FORMAT)
+                    photo.working.add_done_callback(cache_working_image)
+                debug("Pushing %s to photo queue...", filename)
+                self.get_track(photo.serial_number).photo_queue.put(photo)
+                debug("...Pushed %s to photo queue", filename)
 
             except Exception as e:
                 print(f"Failed to add photo: {filename}: {e}")
 
-    def photo_task(self) -> None:
-        print("Running photo task")
-        while True:
-            debug("Waiting for photo...")
-            photo = self.photo_queue.get()
-            debug(f"...got photo {photo.filename}")
-            self.photos.append(photo)
-            self.photos.sort(key=lambda x: x.t_utc)
-            if self.check_for_orbit():
-                for photo in self.photos:
-                    os.remove(photo.filename)
-                self.photos = []
-
 
 def detect_features(filename: str) -> None:
     # This function is currently a stub.
     # Precomputing features here will save processing time oveall,
     # but we need to be careful not to slow down input processing.
-    debug(f"detecting features in {filename}")
+    debug("detecting features in %s", filename)
 
 
+@ASSEMBLE_DATASET_SECONDS.time()
 def assemble_dataset(photos: list[PhotoInfo]) -> None:
     try:
         print(f"Assembling dataset from {len(photos)} photos")
@@ -300,12 +653,32 @@ def assemble_dataset(photos: list[PhotoInfo]) -> None:
         with os.fdopen(fd, 'wb') as f:
             with tarfile.open(fileobj=f, mode='w') as tar:
 
-                for photo in photos:
-                    tar.add(photo.filename, arcname=os.path.join(image_dir, os.path.basename(photo.filename)))
+                names = []
+                for photo, image in prefetch_images(photos):
+                    names.append(os.path.basename(image))
+                    try:
+                        tar.add(image, arcname=os.path.join(image_dir, names[-1]))
+                    finally:
+                        image_cache.unpin(image)
                     features_filepath = photo.filename + ".npz"
                     if os.path.exists(features_filepath):
                         tar.add(features_filepath, arcname=os.path.join(features_dir, os.path.basename(features_filepath)))
 
+                metadata_json = json.dumps({name: photo.metadata() for name, photo in zip(names, photos)}).encode()
+                metadata_info = tarfile.TarInfo(name="image_metadata.json")
+                metadata_info.size = len(metadata_json)
+                tar.addfile(metadata_info, fileobj=io.BytesIO(metadata_json))
+
+                if env.MATCH_PAIRS:
+                    pairs = match_pairs.candidate_pairs(photos, names, env.ALTITUDE_AGL_M, env.CAMERA_HFOV_DEG,
+                                                        env.CAMERA_VFOV_DEG, env.MATCH_NEIGHBORS,
+                                                        env.MATCH_ORDER_NEIGHBORS)
+                    print(f"Selected {len(pairs)} candidate pairs for matching")
+                    pairs_json = json.dumps(pairs).encode()
+                    pairs_info = tarfile.TarInfo(name=os.path.join(opensfm_dir, "candidate_pairs.json"))
+                    pairs_info.size = len(pairs_json)
+                    tar.addfile(pairs_info, fileobj=io.BytesIO(pairs_json))
+
                 stats_dir = os.path.join(opensfm_dir, "stats")
                 stats_file_info = tarfile.TarInfo(name=os.path.join(stats_dir, "stats.json"))
                 stats_file_info.size = 0
@@ -314,9 +687,10 @@ def assemble_dataset(photos: list[PhotoInfo]) -> None:
         bucket_name = get_bucket_name(photos[0])
         dataset_name = get_dataset_name(photos)
         cloud_storage.upload(bucket_name, output_tar, dataset_name)
+        os.remove(output_tar)
         print(f"Uploaded dataset {output_tar} to {bucket_name} as {dataset_name}")
-        vars = {"BUCKET": bucket_name, "DATASET": dataset_name}
-        cloud_run_jobs.run_job(job_name=os.environ['MOSAIC_JOB_NAME'], vars=vars)
-        print(f"Started job: {os.environ['MOSAIC_JOB_NAME']} with vars={vars}")
+        lat = float(np.mean([photo.lat for photo in photos]))
+        lon = float(np.mean([photo.lon for photo in photos]))
+        dispatch.get_dispatcher().submit(bucket_name, dataset_name, lat, lon)
     except Exception as e:
         print(e)
@@ -16,15 +16,32 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from google.cloud import run_v2
-from google import auth
+import threading
+
+# Creating a JobsClient looks up credentials, which takes a while, so one
+# client is shared by every job started by this process.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Imported here so that run_v2 only loads when the first job is started
+            from google.cloud import run_v2
+            from google import auth
+
+            credentials, project_id = auth.default()
+            _client = run_v2.JobsClient(credentials=credentials)
+        return _client
 
 
 def run_job(job_name: str, vars: dict[str, str]):
+    from google.cloud import run_v2
 
     print(f"Running job {job_name} with vars {vars}")
-    credentials, project_id = auth.default()
-    client = run_v2.JobsClient(credentials=credentials)
+    client = get_client()
 
     env = []
     for key, value in vars.items():
@@ -0,0 +1,57 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import BinaryIO
+
+
+class RecentUploads:
+    """Content hashes of the most recent uploads, so that frames a camera uploads
+    again after a dropped response can be acknowledged without any work.
+
+    Holds at most capacity hashes, forgetting the least recently seen first.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.hashes: OrderedDict[bytes, None] = OrderedDict()
+        self.lock = threading.Lock()
+        self.duplicates = 0
+
+    def check(self, digest: bytes) -> bool:
+        """Records digest. Returns True if it was already recorded"""
+        with self.lock:
+            if digest in self.hashes:
+                self.hashes.move_to_end(digest)
+                self.duplicates += 1
+                return True
+            self.hashes[digest] = None
+            if len(self.hashes) > self.capacity:
+                self.hashes.popitem(last=False)
+            return False
+
+
+def copy_and_hash(source: BinaryIO, dest: BinaryIO, chunk_size: int = 1024 * 1024) -> bytes:
+    """Copies source to dest, returning the hash of what was copied"""
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: source.read(chunk_size), b""):
+        h.update(chunk)
+        dest.write(chunk)
+    return h.digest()
@@ -0,0 +1,178 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Starts mosaics for assembled datasets without holding up Batcher.
+#
+# Datasets are handed to a background thread, which starts a mosaic job for
+# them after the coalescing window. Datasets whose centres are within
+# COALESCE_RADIUS_M of a dataset already waiting (e.g. several aircraft
+# orbiting the same incident) join it, and the group is mosaicked as one job
+# with a comma-separated DATASET. Failed dispatches are retried with
+# exponential backoff.
+
+import math
+import random
+import threading
+import time
+import env
+from geo import DEG_LEN
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+class CloudRunJobBackend:
+    """Starts a Cloud Run job per group"""
+
+    def __init__(self, job_name: str) -> None:
+        self.job_name = job_name
+
+    def dispatch(self, bucket_name: str, datasets: list[str]) -> None:
+        import cloud_run_jobs
+        vars = {"BUCKET": bucket_name, "DATASET": ",".join(datasets)}
+        cloud_run_jobs.run_job(job_name=self.job_name, vars=vars)
+        print(f"Started job: {self.job_name} with vars={vars}")
+
+
+class QueueBackend:
+    """Queues each group for long-lived mosaic workers (see dataset_queue.py)"""
+
+    def __init__(self, url: str) -> None:
+        import dataset_queue
+        self.url = url
+        self.queue = dataset_queue.open_queue(url)
+
+    def dispatch(self, bucket_name: str, datasets: list[str]) -> None:
+        entry = {"bucket": bucket_name, "dataset": ",".join(datasets)}
+        self.queue.put(entry)
+        print(f"Queued {entry} on {self.url}")
+
+
+class RecordingBackend:
+    """Local stand-in that records dispatches instead of starting anything"""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.dispatches: list[tuple[str, list[str]]] = []
+        self.failures = failures
+        self.attempts = 0
+
+    def dispatch(self, bucket_name: str, datasets: list[str]) -> None:
+        self.attempts += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("simulated dispatch failure")
+        self.dispatches.append((bucket_name, list(datasets)))
+
+
+class Group:
+    def __init__(self, bucket_name: str, dataset: str, lat: float, lon: float, due: float) -> None:
+        self.bucket_name = bucket_name
+        self.datasets = [dataset]
+        self.lat = lat
+        self.lon = lon
+        self.due = due
+
+    def distance(self, lat: float, lon: float) -> float:
+        # fails across international dateline!
+        return DEG_LEN*math.hypot(lat - self.lat, (lon - self.lon)*math.cos(math.radians(lat)))
+
+
+class Dispatcher:
+    def __init__(self, backend, window_seconds: float, radius_m: float, retries: int = 5,
+                 backoff_seconds: float = 1.0, max_backoff_seconds: float = 60.0) -> None:
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.radius_m = radius_m
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.groups: list[Group] = []
+        self.in_flight = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.dispatch_task, name="dispatcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, bucket_name: str, dataset: str, lat: float, lon: float) -> None:
+        """Schedules a mosaic of dataset, centred at lat, lon. Returns immediately"""
+        with self.condition:
+            for group in self.groups:
+                if group.bucket_name == bucket_name and group.distance(lat, lon) <= self.radius_m:
+                    group.datasets.append(dataset)
+                    print(f"Coalescing {dataset} with {group.datasets[0]}")
+                    return
+            self.groups.append(Group(bucket_name, dataset, lat, lon, time.monotonic() + self.window_seconds))
+            self.condition.notify()
+
+    def pending(self) -> int:
+        """Number of groups waiting for their window or being dispatched"""
+        with self.condition:
+            return len(self.groups) + self.in_flight
+
+    def dispatch_task(self) -> None:
+        while True:
+            with self.condition:
+                while not self.groups:
+                    self.condition.wait()
+                group = min(self.groups, key=lambda g: g.due)
+                delay = group.due - time.monotonic()
+                if delay > 0:
+                    # Woken early by a new group, which may be due sooner
+                    self.condition.wait(delay)
+                    continue
+                self.groups.remove(group)
+                self.in_flight += 1
+            try:
+                self.dispatch(group)
+            finally:
+                with self.condition:
+                    self.in_flight -= 1
+
+    def dispatch(self, group: Group) -> None:
+        backoff = self.backoff_seconds
+        for attempt in range(self.retries + 1):
+            try:
+                self.backend.dispatch(group.bucket_name, group.datasets)
+                self.dispatched += 1
+                return
+            except Exception as e:
+                print(f"Failed to dispatch {group.datasets} (attempt {attempt + 1}): {e}")
+            if attempt < self.retries:
+                time.sleep(backoff*random.uniform(0.5, 1.5))
+                backoff = min(2*backoff, self.max_backoff_seconds)
+        self.failed += 1
+        print(f"Giving up on dispatching {group.datasets}")
+
+
+def get_dispatcher() -> Dispatcher:
+    """The dispatcher configured by the environment, started on first use"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            if env.MOSAIC_QUEUE:
+                backend = QueueBackend(env.MOSAIC_QUEUE)
+            else:
+                backend = CloudRunJobBackend(env.MOSAIC_JOB_NAME)
+            _dispatcher = Dispatcher(backend, env.COALESCE_SECONDS, env.COALESCE_RADIUS_M, env.DISPATCH_RETRIES)
+        return _dispatcher
+
+
+def pending() -> int:
+    """Groups not dispatched yet, without starting a dispatcher"""
+    return 0 if _dispatcher is None else _dispatcher.pending()
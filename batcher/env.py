@@ -47,3 +47,81 @@ def _flag(name: str, default: bool) -> bool:
 # Defaults True so existing deployments are unchanged until SEGMENTATION is
 # explicitly set (e.g. SEGMENTATION=0 on the Cloud Run service).
 SEGMENTATION = _flag("SEGMENTATION", True)
+
+# Number of recent upload content hashes remembered, so that a frame a camera
+# uploads again is acknowledged without being parsed or archived again.
+DEDUP_CAPACITY = int(os.environ.get("DEDUP_CAPACITY", 100000))
+
+# DEBUG logs every step of every image; anything else only logs what used to
+# be printed anyway. Debug messages are not even formatted when disabled.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
+DEBUG = LOG_LEVEL == "DEBUG"
+
+# Sample every thread's stack each PROFILER_INTERVAL_MS, served by the upload
+# server at /profile and /stacks (see sampler.py).
+PROFILER = _flag("PROFILER", False)
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", 10))
+
+# Directory of append-only spools, one per aircraft, of the photos held for its
+# open orbit. Each instance writes under its own subdirectory, and takes over
+# an aircraft's spool once the instance that wrote it is gone. Point it at
+# shared storage with POSIX append, rename and locking (e.g. a Filestore NFS
+# mount, not Cloud Storage FUSE). Unset disables it.
+SPOOL_PATH = os.environ.get("SPOOL_PATH")
+
+# Number of threads parsing and archiving incoming images. Orbit detection
+# runs on a separate thread per aircraft regardless.
+INPUT_WORKERS = int(os.environ.get("INPUT_WORKERS", 4))
+
+# Splits the fleet across several Batcher instances. Every instance archives
+# whatever it receives, but only batches aircraft whose serial number hashes
+# (see batcher.shard_for) to SHARD_INDEX, so uploads should be routed by the
+# same hash. The defaults make a single instance own every aircraft.
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", 1))
+SHARD_INDEX = int(os.environ.get("SHARD_INDEX", 0))
+
+# RAM budget for local copies of images in open orbits. Over budget, the
+# least recently needed images that are already archived are deleted from
+# tmpfs and downloaded again when a dataset needs them.
+IMAGE_CACHE_MB = float(os.environ.get("IMAGE_CACHE_MB", 1024))
+
+# Drop frames that overlap their neighbours by more than needed before the
+# dataset is packed (see thinning.py). Off by default because the footprint
+# estimate depends on the camera and altitude settings below.
+THINNING = _flag("THINNING", False)
+ALTITUDE_AGL_M = float(os.environ.get("ALTITUDE_AGL_M", 1000))
+CAMERA_HFOV_DEG = float(os.environ.get("CAMERA_HFOV_DEG", 50))
+CAMERA_VFOV_DEG = float(os.environ.get("CAMERA_VFOV_DEG", 40))
+FORWARD_OVERLAP = float(os.environ.get("FORWARD_OVERLAP", 0.8))
+SIDE_OVERLAP = float(os.environ.get("SIDE_OVERLAP", 0.6))
+
+# Ship GPS-based candidate image pairs in the dataset (see match_pairs.py) so
+# the mosaic job only matches those. Uses the footprint settings above.
+MATCH_PAIRS = _flag("MATCH_PAIRS", False)
+MATCH_NEIGHBORS = int(os.environ.get("MATCH_NEIGHBORS", 12))
+MATCH_ORDER_NEIGHBORS = int(os.environ.get("MATCH_ORDER_NEIGHBORS", 2))
+
+# Also produce a rough mosaic from GPS alone (see quicklook.py), made in the
+# background while the dataset is packed, with pixels of QUICKLOOK_GSD_M meters.
+QUICKLOOK = _flag("QUICKLOOK", False)
+QUICKLOOK_GSD_M = float(os.environ.get("QUICKLOOK_GSD_M", 5))
+
+# Where mosaics are started (see dispatch.py). With MOSAIC_QUEUE set, datasets
+# are queued for long-lived mosaic workers, otherwise each group of datasets
+# starts a run of the Cloud Run job MOSAIC_JOB_NAME.
+MOSAIC_JOB_NAME = os.environ.get("MOSAIC_JOB_NAME")
+MOSAIC_QUEUE = os.environ.get("MOSAIC_QUEUE")
+
+# Datasets centred within COALESCE_RADIUS_M of a dataset that is still within
+# its COALESCE_SECONDS window are mosaicked together with it. The default of
+# 0 starts each mosaic right away.
+COALESCE_SECONDS = float(os.environ.get("COALESCE_SECONDS", 0))
+COALESCE_RADIUS_M = float(os.environ.get("COALESCE_RADIUS_M", 2000))
+DISPATCH_RETRIES = int(os.environ.get("DISPATCH_RETRIES", 5))
+
+# Decode each JXL image at ingest on a process pool and pack a downscaled
+# TIFF or JPEG copy into the dataset instead, so the mosaic job doesn't have
+# to decode JXL. Originals are still archived in images/.
+WORKING_IMAGES = _flag("WORKING_IMAGES", False)
+WORKING_IMAGE_MAX_SIZE = int(os.environ.get("WORKING_IMAGE_MAX_SIZE", 2048))
+WORKING_IMAGE_FORMAT = os.environ.get("WORKING_IMAGE_FORMAT", "tif")
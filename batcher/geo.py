@@ -0,0 +1,33 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Flat-earth geometry for the short distances within a dataset.
+
+import math
+import numpy as np
+from numpy.typing import NDArray
+
+DEG_LEN = 6371000*math.radians(1)
+
+
+def local_positions(photos: list) -> NDArray:
+    """Returns the (north, east) positions in meters of photos relative to the first one"""
+    lat0 = photos[0].lat
+    lon0 = photos[0].lon
+    # fails across international dateline!
+    return DEG_LEN*np.array([[p.lat - lat0, (p.lon - lon0)*math.cos(math.radians(lat0))] for p in photos])
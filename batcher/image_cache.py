@@ -0,0 +1,131 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class ImageCache:
+    """Size accounting for the local (tmpfs, so RAM) copies of images in open orbits.
+
+    Files are kept in least-recently-needed order. When the total goes over
+    budget_bytes, the oldest files that have already been archived to the
+    bucket are deleted; they are downloaded again if a dataset needs them.
+    Pinned files (e.g. waiting to be written into a dataset) are never
+    deleted until their last pin is released.
+    """
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self.files: OrderedDict[str, int] = OrderedDict()
+        self.archived: set[str] = set()
+        self.pins: dict[str, int] = {}
+        self.removed: set[str] = set()  # Pinned files to delete once unpinned
+        self.lock = threading.Lock()
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.fetched_bytes = 0
+
+    def add(self, filename: str, archived: bool, pinned: bool = False) -> None:
+        size = os.path.getsize(filename)
+        with self.lock:
+            self.cached_bytes += size - self.files.get(filename, 0)
+            self.files[filename] = size
+            self.files.move_to_end(filename)
+            if archived:
+                self.archived.add(filename)
+            if pinned:
+                self.pins[filename] = self.pins.get(filename, 0) + 1
+            self.evict()
+
+    def evict(self) -> None:
+        for filename in list(self.files):
+            if self.cached_bytes <= self.budget_bytes:
+                break
+            if filename not in self.archived or filename in self.pins:
+                continue
+            size = self.files.pop(filename)
+            self.archived.discard(filename)
+            self.cached_bytes -= size
+            self.evicted_files += 1
+            self.evicted_bytes += size
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+
+    def pin(self, filename: str) -> bool:
+        """Marks a file as just needed and keeps it on disk until unpin().
+
+        Returns False, without pinning, if it is no longer on disk.
+        """
+        with self.lock:
+            if filename in self.files:
+                self.files.move_to_end(filename)
+            elif filename in self.removed or not os.path.exists(filename):
+                self.misses += 1
+                return False
+            self.pins[filename] = self.pins.get(filename, 0) + 1
+            self.hits += 1
+            return True
+
+    def unpin(self, filename: str) -> None:
+        with self.lock:
+            pins = self.pins.pop(filename, 0) - 1
+            if pins > 0:
+                self.pins[filename] = pins
+                return
+            if filename not in self.removed:
+                self.evict()
+                return
+            self.removed.discard(filename)
+        self.remove(filename)
+
+    def fetched(self, filename: str, pinned: bool = False) -> None:
+        with self.lock:
+            self.fetched_bytes += os.path.getsize(filename)
+        self.add(filename, archived=True, pinned=pinned)
+
+    def remove(self, filename: str) -> None:
+        """Deletes a file that is no longer needed, or once it is unpinned if it is pinned"""
+        with self.lock:
+            if filename in self.pins:
+                self.removed.add(filename)
+                return
+            self.cached_bytes -= self.files.pop(filename, 0)
+            self.archived.discard(filename)
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"files": len(self.files),
+                    "pinned_files": len(self.pins),
+                    "cached_bytes": self.cached_bytes,
+                    "budget_bytes": self.budget_bytes,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evicted_files": self.evicted_files,
+                    "evicted_bytes": self.evicted_bytes,
+                    "fetched_bytes": self.fetched_bytes}
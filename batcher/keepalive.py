@@ -16,45 +16,73 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-import requests
+import threading
 import time
-import urllib
-import google.auth.transport.requests
-import google.oauth2.id_token
-from concurrent.futures import ThreadPoolExecutor
+import urllib.request
+from typing import Callable
+
+FAILURE_PAUSE_SECONDS = 1
 
 
 class KeepAlive:
-    def __init__(self, service_url: str, keepalive_time: float) -> None:
+    """Keeps the Cloud Run instance busy while there is work it must not lose.
+
+    Pings are sent one at a time, back to back, only while the server was
+    poked within keepalive_time or busy() reports pending work. Otherwise
+    the thread sleeps until the next poke. A failed ping is followed by a
+    pause, so a persistent error doesn't become a tight request loop.
+    """
+
+    def __init__(self, service_url: str, keepalive_time: float, busy: Callable[[], bool] | None = None) -> None:
         self.service_url = service_url
         self.endpoint = f"{service_url}/keepalive"
         self.keepalive_time = keepalive_time
-        self.executor = ThreadPoolExecutor()
-        self.future = self.executor.submit(self.task)
+        self.busy = busy
         self.start_time = time.time()
+        self.wake = threading.Event()
+        self.session = None
+        self.pings = 0
+        self.thread = threading.Thread(target=self.task, daemon=True)
+        self.thread.start()
 
     def poke(self) -> None:
         self.start_time = time.time()
+        self.wake.set()
+
+    def needed(self) -> bool:
+        if time.time() - self.start_time < self.keepalive_time:
+            return True
+        return self.busy is not None and self.busy()
+
+    def ping(self) -> bool:
+        if self.session is None:
+            # google.auth is imported and the ID token fetched only once a
+            # keepalive is actually due, keeping both off the startup path.
+            # The session pools connections and reuses the token until it
+            # expires, refreshing it on a 401.
+            import google.auth.transport.requests
+            import google.oauth2.id_token
+            credentials = google.oauth2.id_token.fetch_id_token_credentials(self.service_url)
+            self.session = google.auth.transport.requests.AuthorizedSession(credentials)
+        res = self.session.get(self.endpoint, timeout=30)
+        self.pings += 1
+        if res.status_code != 200:
+            print(f"Keepalive request failed: {res.status_code}")
+            return False
+        return True
 
     def task(self) -> None:
-        futures = []
-        auth_req = google.auth.transport.requests.Request()
-        id_token = google.oauth2.id_token.fetch_id_token(auth_req, self.service_url)
         while True:
+            if not self.needed():
+                self.wake.wait()
+                self.wake.clear()
+                continue
             try:
-                time.sleep(1)
-                if len(futures) > 0 and futures[0].done():
-                    res = futures[0].result()
-                    if res.status != 200:
-                        print(f"Keepalive request failed: {res.status}, re-requesting ID token")
-                        id_token = google.oauth2.id_token.fetch_id_token(auth_req, self.service_url)
-                    del futures[0]
-                if time.time() - self.start_time < self.keepalive_time:
-                    req = urllib.request.Request(self.endpoint)
-                    req.add_header("Authorization", f"Bearer {id_token}")
-                    futures.append(self.executor.submit(urllib.request.urlopen, req))
+                if self.ping():
+                    continue
             except Exception as e:
                 print(f"Exception in keepalive thread: {e}")
+            time.sleep(FAILURE_PAUSE_SECONDS)
 
 
 def make_authorized_get_request(endpoint, audience):
@@ -69,6 +97,9 @@ def make_authorized_get_request(endpoint, audience):
     # For Cloud Run, `endpoint` is the URL (hostname + path) receiving the request
     # endpoint = 'https://my-cloud-run-service.run.app/my/awesome/url'
 
+    import google.auth.transport.requests
+    import google.oauth2.id_token
+
     req = urllib.request.Request(endpoint)
 
     auth_req = google.auth.transport.requests.Request()
@@ -0,0 +1,52 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Picks the image pairs OpenSfM should try to match, from GPS alone.
+#
+# Images are nadir, so two images can only share features if their
+# footprints overlap, which means their GPS positions must be closer than
+# about a footprint. That includes the start and end of an orbit, which
+# are close in space but far apart in time. Immediate neighbours in time
+# are always paired too, so the orbit stays connected even where GPS is
+# poor.
+
+import numpy as np
+from geo import local_positions
+from thinning import footprint_size
+
+
+def candidate_pairs(photos: list, names: list[str], altitude: float, hfov_deg: float, vfov_deg: float,
+                    max_neighbors: int, order_neighbors: int, min_overlap: float = 0.3) -> list[tuple[str, str]]:
+    """Returns candidate pairs of names, where names[i] is the dataset image name of photos[i]"""
+    n = len(photos)
+    along, across = footprint_size(altitude, hfov_deg, vfov_deg)
+    max_distance = (1 - min_overlap)*min(along, across)
+
+    pos = local_positions(photos)
+    distances = np.linalg.norm(pos[:, np.newaxis, :] - pos[np.newaxis, :, :], axis=-1)
+    np.fill_diagonal(distances, np.inf)
+
+    pairs = set()
+    nearest = np.argsort(distances, axis=1)[:, :max_neighbors]
+    for i in range(n):
+        for j in nearest[i]:
+            if distances[i, j] <= max_distance:
+                pairs.add((min(i, j), max(i, j)))
+        for j in range(i + 1, min(i + 1 + order_neighbors, n)):
+            pairs.add((i, j))
+    return [(names[i], names[j]) for i, j in sorted(pairs)]
@@ -0,0 +1,112 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Runtime metrics for Batcher, served by upload_server at /metrics in the
+# Prometheus text format.
+#
+# Histograms are recorded as things happen and cost a lock and a few
+# additions per observation. Gauges are callables that are only evaluated
+# when /metrics is scraped.
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, math.inf)
+
+_lock = threading.Lock()
+_histograms: dict[str, "Histogram"] = {}
+_gauges: dict[str, tuple[str, Callable[[], float]]] = {}
+
+
+class Histogram:
+    """Latency histogram in seconds with fixed, cumulative buckets"""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self.lock:
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+            self.count += 1
+            self.sum += seconds
+
+    @contextmanager
+    def time(self):
+        """Times the block, or the function if used as a decorator"""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t)
+
+    def render(self) -> list[str]:
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            total = self.sum
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = "+Inf" if bound == math.inf else repr(float(bound))
+            lines.append(f'{self.name}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+def histogram(name: str, help: str) -> Histogram:
+    """Returns the histogram called name, creating it on first use"""
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram(name, help)
+        return _histograms[name]
+
+
+def gauge(name: str, help: str, value: Callable[[], float]) -> None:
+    """Registers a gauge, replacing any previous one of the same name"""
+    with _lock:
+        _gauges[name] = (help, value)
+
+
+def render() -> str:
+    with _lock:
+        histograms = list(_histograms.values())
+        gauges = list(_gauges.items())
+    lines = []
+    for h in histograms:
+        lines += h.render()
+    for name, (help, value) in gauges:
+        try:
+            v = value()
+        except Exception:
+            continue  # e.g. qsize() is not available on every platform
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {v}"]
+    return "\n".join(lines) + "\n"
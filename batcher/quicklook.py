@@ -0,0 +1,146 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Rough mosaic of an orbit from GPS alone, available seconds after the orbit
+# closes instead of minutes.
+#
+# Every image is assumed to look straight down from altitude onto flat
+# ground, with its top edge pointing along the GPS track. Each output pixel
+# inside an image's footprint is mapped back into that image (nearest
+# neighbour) and overlapping images are averaged. The result is a float32
+# GeoTIFF in EPSG:4326 with NaN where there is no image.
+
+import math
+import multiprocessing as mp
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from geo import DEG_LEN
+from thinning import footprint_size
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: Batcher is full of threads
+        _executor = ProcessPoolExecutor(mp_context=mp.get_context("spawn"))
+    return _executor
+
+
+def read_image(filename: str) -> np.ndarray:
+    """Returns a single-band float32 image"""
+    if filename.endswith(".jxl"):
+        import imagecodecs
+        with open(filename, "rb") as f:
+            image = imagecodecs.jpegxl_decode(f.read())
+    else:
+        from PIL import Image
+        image = np.asarray(Image.open(filename))
+    image = image.astype(np.float32)
+    if image.ndim == 3:
+        image = image[:, :, :3].mean(axis=2)
+    return image
+
+
+def project_image(filename: str, lat: float, lon: float, track_deg: float, altitude: float,
+                  hfov_deg: float, vfov_deg: float, grid: tuple[float, float, float, float]):
+    """Projects one image onto the output grid (top latitude, left longitude, pixel height and
+    width in degrees). Returns the grid row and column of the patch and the patch itself"""
+    top, left, dlat, dlon = grid
+    image = read_image(filename)
+    h, w = image.shape
+    fx = (w / 2) / math.tan(math.radians(hfov_deg) / 2)
+    fy = (h / 2) / math.tan(math.radians(vfov_deg) / 2)
+
+    along, across = footprint_size(altitude, hfov_deg, vfov_deg)
+    radius = math.hypot(along, across) / 2
+    r0 = int((top - lat - radius / DEG_LEN) / dlat)
+    r1 = int(math.ceil((top - lat + radius / DEG_LEN) / dlat))
+    c0 = int((lon - left - radius / (DEG_LEN * math.cos(math.radians(lat)))) / dlon)
+    c1 = int(math.ceil((lon - left + radius / (DEG_LEN * math.cos(math.radians(lat)))) / dlon))
+
+    rows, cols = np.mgrid[r0:r1, c0:c1]
+    north = (top - (rows + 0.5) * dlat - lat) * DEG_LEN
+    east = (left + (cols + 0.5) * dlon - lon) * DEG_LEN * math.cos(math.radians(lat))
+    t = math.radians(track_deg)
+    forward = north * math.cos(t) + east * math.sin(t)
+    right = -north * math.sin(t) + east * math.cos(t)
+
+    u = np.rint(w / 2 + right / altitude * fx).astype(np.int64)
+    v = np.rint(h / 2 - forward / altitude * fy).astype(np.int64)
+    inside = (u >= 0) & (u < w) & (v >= 0) & (v < h)
+    patch = np.full(rows.shape, np.nan, dtype=np.float32)
+    patch[inside] = image[v[inside], u[inside]]
+    return r0, c0, patch
+
+
+def make_quicklook(photos: list, filenames: list[str], output: str, altitude: float,
+                   hfov_deg: float, vfov_deg: float, gsd: float) -> None:
+    """Writes a quick-look GeoTIFF of photos, whose images are at filenames, with gsd meter pixels"""
+    photos = [(p, f) for p, f in zip(photos, filenames) if p.dir is not None]
+    lats = np.array([p.lat for p, _ in photos])
+    lons = np.array([p.lon for p, _ in photos])
+    along, across = footprint_size(altitude, hfov_deg, vfov_deg)
+    margin = math.hypot(along, across) / 2
+    mid_lat = float(lats.mean())
+    dlat = gsd / DEG_LEN
+    dlon = gsd / (DEG_LEN * math.cos(math.radians(mid_lat)))
+    top = lats.max() + margin / DEG_LEN
+    left = lons.min() - margin / (DEG_LEN * math.cos(math.radians(mid_lat)))
+    height = int(math.ceil((top - lats.min() + margin / DEG_LEN) / dlat))
+    width = int(math.ceil((lons.max() - left + margin / (DEG_LEN * math.cos(math.radians(mid_lat)))) / dlon))
+    grid = (float(top), float(left), dlat, dlon)
+
+    total = np.zeros((height, width), dtype=np.float32)
+    count = np.zeros((height, width), dtype=np.uint16)
+    futures = [get_executor().submit(project_image, f, p.lat, p.lon,
+                                     math.degrees(math.atan2(p.dir[1], p.dir[0])),
+                                     altitude, hfov_deg, vfov_deg, grid)
+               for p, f in photos]
+    for future in futures:
+        r0, c0, patch = future.result()
+        # Patches can stick out of the grid by a pixel of rounding
+        rs, cs = max(r0, 0), max(c0, 0)
+        re, ce = min(r0 + patch.shape[0], height), min(c0 + patch.shape[1], width)
+        patch = patch[rs - r0:re - r0, cs - c0:ce - c0]
+        valid = ~np.isnan(patch)
+        total[rs:re, cs:ce][valid] += patch[valid]
+        count[rs:re, cs:ce][valid] += 1
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mosaic = np.where(count > 0, total / count, np.nan).astype(np.float32)
+    write_geotiff(output, mosaic, grid)
+
+
+def write_geotiff(output: str, data: np.ndarray, grid: tuple[float, float, float, float]) -> None:
+    """Writes a float32 EPSG:4326 GeoTIFF with Pillow, so Batcher doesn't need GDAL"""
+    from PIL import Image, TiffImagePlugin, TiffTags
+
+    top, left, dlat, dlon = grid
+    ifd = TiffImagePlugin.ImageFileDirectory_v2()
+    ifd[33550] = (dlon, dlat, 0.0)  # ModelPixelScale
+    ifd.tagtype[33550] = TiffTags.DOUBLE
+    ifd[33922] = (0.0, 0.0, 0.0, left, top, 0.0)  # ModelTiepoint
+    ifd.tagtype[33922] = TiffTags.DOUBLE
+    # GeoKeyDirectory: geographic model, pixel is area, WGS 84
+    ifd[34735] = (1, 1, 0, 3, 1024, 0, 1, 2, 1025, 0, 1, 1, 2048, 0, 1, 4326)
+    ifd.tagtype[34735] = TiffTags.SHORT
+    ifd[42113] = "nan"  # GDAL_NODATA
+    ifd.tagtype[42113] = TiffTags.ASCII
+    Image.fromarray(data).save(output, format="TIFF", tiffinfo=ifd)
@@ -0,0 +1,81 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Sampling profiler for the upload server, enabled with PROFILER=1.
+#
+# A daemon thread looks at every thread's stack each PROFILER_INTERVAL_MS and
+# counts the stacks it sees. /profile returns the counts in the collapsed
+# format flamegraph.pl and speedscope read; /stacks dumps what every thread is
+# doing right now.
+
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+
+def thread_names() -> dict[int, str]:
+    return {t.ident: t.name for t in threading.enumerate()}
+
+
+def dump_stacks() -> str:
+    """Returns the current stack of every thread"""
+    names = thread_names()
+    out = []
+    for ident, frame in sys._current_frames().items():
+        out.append(f"Thread {names.get(ident, ident)}:")
+        out.append("".join(traceback.format_stack(frame)))
+    return "\n".join(out)
+
+
+def collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="sampler", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            names = thread_names()
+            stacks = [f"{names.get(ident, ident)};{collapse(frame)}"
+                      for ident, frame in sys._current_frames().items() if ident != me]
+            with self.lock:
+                self.samples.update(stacks)
+
+    def collapsed(self, reset: bool = False) -> str:
+        with self.lock:
+            samples = self.samples
+            if reset:
+                self.samples = Counter()
+            else:
+                samples = Counter(samples)
+        return "\n".join(f"{stack} {n}" for stack, n in samples.most_common()) + "\n"
@@ -0,0 +1,132 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import fcntl
+import json
+import os
+import threading
+from collections.abc import Iterator
+
+LOCK_NAME = "instance.lock"
+
+
+class Spool:
+    """Append-only log of the photos Batcher is holding for an open orbit.
+
+    Each line is one JSON record. A spool has a single writer, and relies on
+    O_APPEND writes, fsync and an atomic os.replace, so it needs a POSIX
+    filesystem such as an NFS (Filestore) mount. Cloud Storage FUSE mounts
+    re-upload the whole object on every fsync and do not rename atomically.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+    def load(self) -> list[dict]:
+        records = []
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Last line may be torn if the instance died mid-write
+                        print(f"Skipping corrupt spool record in {self.path}")
+        except FileNotFoundError:
+            pass
+        return records
+
+    def append(self, record: dict) -> None:
+        with self.lock:
+            if self.file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self.file = open(self.path, "a")
+            self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def rewrite(self, records: list[dict]) -> None:
+        """Atomically replaces the spool contents, dropping records that are no longer needed"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+class SpoolDir:
+    """One instance's spools, kept in their own directory under a shared root.
+
+    The instance holds a lock on its directory for as long as it runs. The
+    lock is released when the process dies (on NFS, once the client's lease
+    expires), which is how other instances tell that spools are orphaned.
+    """
+
+    def __init__(self, root: str, instance_id: str) -> None:
+        self.root = root
+        self.path = os.path.join(root, instance_id)
+        os.makedirs(self.path, exist_ok=True)
+        self.lock_file = open(os.path.join(self.path, LOCK_NAME), "a")
+        fcntl.lockf(self.lock_file, fcntl.LOCK_EX)
+
+    def spool(self, name: str) -> Spool:
+        return Spool(os.path.join(self.path, name))
+
+    def orphans(self, name: str | None = None) -> Iterator[str]:
+        """Yields the spools named name (or all spools) left by instances that are gone.
+
+        The dead instance's directory stays locked while its spools are
+        yielded, so the caller should take over the records and delete each
+        file before moving on. Emptied directories are removed.
+        """
+        try:
+            instances = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return
+        for instance in instances:
+            path = os.path.join(self.root, instance)
+            if path == self.path:
+                continue
+            try:
+                lock_file = open(os.path.join(path, LOCK_NAME), "r+")
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with lock_file:
+                try:
+                    fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # Still running
+                names = [name] if name is not None else sorted(os.listdir(path))
+                for spool_name in names:
+                    if spool_name.endswith(".jsonl") and os.path.exists(os.path.join(path, spool_name)):
+                        yield os.path.join(path, spool_name)
+                if not any(n.endswith(".jsonl") for n in os.listdir(path)):
+                    try:
+                        os.remove(os.path.join(path, LOCK_NAME))
+                        os.rmdir(path)
+                    except OSError:
+                        pass
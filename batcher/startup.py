@@ -0,0 +1,89 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Startup profiling for the upload server.
+#
+# Run this file directly for a repeatable cold-start measurement. Each run
+# starts a fresh interpreter, so nothing is cached between samples:
+#   python startup.py [runs]
+
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.timings: list[tuple[str, float]] = []
+
+    @contextmanager
+    def timed(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append((name, time.perf_counter() - t))
+
+    def import_module(self, name: str):
+        with self.timed(f"import {name}"):
+            return importlib.import_module(name)
+
+    def report(self) -> dict:
+        return {"since_start_seconds": round(time.perf_counter() - self.t0, 4),
+                "steps": {name: round(seconds, 4) for name, seconds in self.timings}}
+
+    def print_report(self) -> None:
+        print(json.dumps({"severity": "INFO", "message": "startup profile", "startup": self.report()}))
+
+
+SAMPLE = """
+import os, time
+t = time.perf_counter()
+import upload_server
+ready = time.perf_counter()
+upload_server.loaded.wait()
+print(ready - t, time.perf_counter() - t, flush=True)
+os._exit(0)
+"""
+
+
+def measure(runs: int) -> None:
+    env = dict(os.environ)
+    env.setdefault("KEEPALIVE_SECONDS", "60")
+    env.setdefault("STORAGE_BUCKET", "startup-benchmark")
+    here = os.path.dirname(os.path.abspath(__file__))
+    ready = []
+    loaded = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", SAMPLE], cwd=here, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        r, l = out.strip().splitlines()[-1].split()
+        ready.append(float(r))
+        loaded.append(float(l))
+    print(f"accepting uploads after {statistics.median(ready):.3f} s (median of {runs})")
+    print(f"batcher loaded after {statistics.median(loaded):.3f} s (median of {runs})")
+
+
+if __name__ == "__main__":
+    measure(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,82 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from dispatch import Dispatcher, RecordingBackend
+from geo import DEG_LEN
+
+LAT = 45.0
+LON = -122.0
+
+
+def wait_idle(dispatcher: Dispatcher, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while dispatcher.pending() > 0:
+        assert time.monotonic() < deadline, "dispatcher did not finish"
+        time.sleep(0.01)
+
+
+def test_nearby_datasets_are_coalesced():
+    backend = RecordingBackend()
+    dispatcher = Dispatcher(backend, window_seconds=0.3, radius_m=2000)
+    dispatcher.submit("bucket", "a", LAT, LON)
+    dispatcher.submit("bucket", "b", LAT + 1000/DEG_LEN, LON)
+    wait_idle(dispatcher)
+    assert backend.dispatches == [("bucket", ["a", "b"])]
+    assert dispatcher.dispatched == 1
+
+
+def test_distant_datasets_and_other_buckets_are_separate():
+    backend = RecordingBackend()
+    dispatcher = Dispatcher(backend, window_seconds=0.3, radius_m=2000)
+    dispatcher.submit("bucket", "a", LAT, LON)
+    dispatcher.submit("bucket", "far", LAT + 3000/DEG_LEN, LON)
+    dispatcher.submit("other", "c", LAT, LON)
+    wait_idle(dispatcher)
+    assert sorted(backend.dispatches) == [("bucket", ["a"]), ("bucket", ["far"]), ("other", ["c"])]
+
+
+def test_datasets_after_the_window_are_separate():
+    backend = RecordingBackend()
+    dispatcher = Dispatcher(backend, window_seconds=0.1, radius_m=2000)
+    dispatcher.submit("bucket", "a", LAT, LON)
+    wait_idle(dispatcher)
+    dispatcher.submit("bucket", "b", LAT, LON)
+    wait_idle(dispatcher)
+    assert backend.dispatches == [("bucket", ["a"]), ("bucket", ["b"])]
+
+
+def test_failed_dispatch_is_retried():
+    backend = RecordingBackend(failures=2)
+    dispatcher = Dispatcher(backend, window_seconds=0, radius_m=2000, retries=3, backoff_seconds=0.01)
+    dispatcher.submit("bucket", "a", LAT, LON)
+    wait_idle(dispatcher)
+    assert backend.attempts == 3
+    assert backend.dispatches == [("bucket", ["a"])]
+    assert (dispatcher.dispatched, dispatcher.failed) == (1, 0)
+
+
+def test_dispatch_gives_up_after_retries():
+    backend = RecordingBackend(failures=10)
+    dispatcher = Dispatcher(backend, window_seconds=0, radius_m=2000, retries=2, backoff_seconds=0.01)
+    dispatcher.submit("bucket", "a", LAT, LON)
+    wait_idle(dispatcher)
+    assert backend.attempts == 3
+    assert backend.dispatches == []
+    assert (dispatcher.dispatched, dispatcher.failed) == (0, 1)
@@ -0,0 +1,108 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import subprocess
+import sys
+import time
+import traceback
+
+import numpy as np
+import pytest
+
+imagecodecs = pytest.importorskip("imagecodecs")
+from PIL import Image
+
+if __name__ == "__main__":
+    import conftest  # noqa: F401 -- sets up the import path outside of pytest
+
+import batcher
+import cloud_storage
+import env
+from local_storage import LocalClient
+
+
+def make_jxl(path: str) -> None:
+    """Writes a small JXL in a container with the EXIF Batcher needs"""
+    exif = Image.Exif()
+    exif_ifd = exif.get_ifd(0x8769)
+    exif_ifd[0x9003] = "2025:08:01 12:00:00"  # DateTimeOriginal
+    exif_ifd[0xA431] = "SN123"  # BodySerialNumber
+    exif_ifd[0x9291] = "25"  # SubSecTimeOriginal
+    exif.get_ifd(0x8825).update({1: "N", 2: (40.0, 0.0, 0.0), 3: "W", 4: (105.0, 0.0, 0.0),
+                                 12: "K", 13: 100.0, 14: "T", 15: 90.0})
+    tiff = exif.tobytes().removeprefix(b"Exif\x00\x00")
+    codestream = imagecodecs.jpegxl_encode(np.zeros((64, 64, 3), dtype=np.uint8))
+
+    def box(box_type: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", 8 + len(payload)) + box_type + payload
+
+    with open(path, "wb") as f:
+        f.write(b"\x00\x00\x00\x0cJXL \r\n\x87\n")
+        f.write(box(b"ftyp", b"jxl \x00\x00\x00\x00jxl "))
+        f.write(box(b"Exif", b"\x00\x00\x00\x00" + tiff))
+        f.write(box(b"jxlc", codestream))
+
+
+def run_input_task(tmp_path: str) -> None:
+    """Pushes one frame through Batcher.input_task with the decoder enabled"""
+    os.environ["STORAGE_BUCKET"] = "bucket"
+    cloud_storage._client = LocalClient(os.path.join(tmp_path, "storage"))
+    env.SEGMENTATION = True
+    env.WORKING_IMAGES = True
+    env.SPOOL_PATH = None
+
+    b = batcher.Batcher()
+    assert b.decoder is not None
+    try:
+        filename = os.path.join(tmp_path, "frame.jxl")
+        make_jxl(filename)
+        b.on_new_file(filename)
+
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            track = b.tracks.get("SN123")
+            if track is not None and track.photos:
+                break
+            time.sleep(0.1)
+        else:
+            raise AssertionError("photo never reached its track")
+
+        photo = track.photos[0]
+        assert photo.metadata()["utc_time"] % 1 == 0.25
+        assert photo.working is not None
+        assert os.path.exists(photo.working.result(timeout=60))
+    finally:
+        b.decoder.shutdown()
+
+
+def test_photo_with_working_image_reaches_track(tmp_path):
+    # The input workers never return, so the Batcher runs in its own process
+    result = subprocess.run([sys.executable, __file__, str(tmp_path)], capture_output=True, text=True,
+                            timeout=180)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+if __name__ == "__main__":
+    try:
+        run_input_task(sys.argv[1])
+    except BaseException:
+        traceback.print_exc()
+        os._exit(1)
+    os._exit(0)
@@ -0,0 +1,48 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+from types import SimpleNamespace
+
+import keepalive
+from keepalive import KeepAlive
+
+
+class FailingSession:
+    def __init__(self) -> None:
+        self.requests = 0
+
+    def get(self, url: str, timeout: float) -> SimpleNamespace:
+        self.requests += 1
+        return SimpleNamespace(status_code=403)
+
+
+def test_failed_pings_are_spaced_out(monkeypatch):
+    monkeypatch.setattr(keepalive, "FAILURE_PAUSE_SECONDS", 0.2)
+    session = FailingSession()
+    watchdog = KeepAlive.__new__(KeepAlive)
+    watchdog.session = session
+    watchdog.endpoint = "https://service/keepalive"
+    watchdog.needed = lambda: True
+    watchdog.pings = 0
+
+    thread = threading.Thread(target=watchdog.task, daemon=True)
+    thread.start()
+    time.sleep(1)
+    assert 3 <= session.requests <= 6
@@ -0,0 +1,42 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from types import SimpleNamespace
+
+from batcher import PhotoInfo, Track
+
+
+def record(i: int, v: list[float] | None) -> dict:
+    return {"filename": f"/nonexistent/{i}.jxl", "storage_name": f"images/{i}.jxl", "lat": 40.0, "lon": -105.0,
+            "alt": 1000.0, "t_utc": 1.7e9 + 30 * i, "v": v, "groundspeed": 30.0, "serial_number": "SN1"}
+
+
+def test_photo_without_track_does_not_stop_the_track():
+    track = Track(SimpleNamespace(spools=None), "SN1")
+    track.thread.start()
+    track.photo_queue.put(PhotoInfo.from_record(record(0, [30.0, 0.0])))
+    track.photo_queue.put(PhotoInfo.from_record(record(1, None)))
+    track.photo_queue.put(PhotoInfo.from_record(record(2, [30.0, 0.0])))
+
+    deadline = time.monotonic() + 10
+    while not track.photo_queue.empty() or len(track.photos) < 2:
+        assert time.monotonic() < deadline, "track stopped taking photos"
+        time.sleep(0.05)
+    assert track.thread.is_alive()
+    assert [photo.storage_name for photo in track.photos] == ["images/0.jxl", "images/2.jxl"]
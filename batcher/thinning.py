@@ -0,0 +1,100 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Drops frames that add little ground coverage before a dataset is packed.
+#
+# Each frame's footprint is a nadir rectangle of footprint_size(), centred on
+# its GPS position and aligned with its track. Frames are walked in time
+# order and a frame is kept only if skipping it would leave the next frame
+# below the target overlap with the last kept frame.
+#
+# Run this file directly to see the effect on a synthetic orbit:
+#   python thinning.py [frames_per_second]
+
+import math
+import sys
+import numpy as np
+from types import SimpleNamespace
+from geo import DEG_LEN, local_positions
+
+
+def footprint_size(altitude: float, hfov_deg: float, vfov_deg: float) -> tuple[float, float]:
+    """Returns (along track, across track) ground size in meters of a nadir image"""
+    along = 2*altitude*math.tan(math.radians(vfov_deg)/2)
+    across = 2*altitude*math.tan(math.radians(hfov_deg)/2)
+    return along, across
+
+
+def overlaps(photos: list, altitude: float, hfov_deg: float, vfov_deg: float):
+    """Returns a function giving the (forward, side) overlap of photo b with photo a"""
+    along, across = footprint_size(altitude, hfov_deg, vfov_deg)
+    pos = local_positions(photos)
+    dirs = np.array([p.dir for p in photos])
+
+    def overlap(a: int, b: int) -> tuple[float, float]:
+        d = pos[b] - pos[a]
+        forward = abs(np.dot(d, dirs[a]))
+        side = abs(d[0]*dirs[a][1] - d[1]*dirs[a][0])
+        # A change of heading swings the ends of the footprint sideways
+        sin_turn = abs(dirs[a][0]*dirs[b][1] - dirs[a][1]*dirs[b][0])
+        side += along/2*sin_turn
+        return 1 - forward/along, 1 - side/across
+
+    return overlap
+
+
+def thin(photos: list, altitude: float, hfov_deg: float, vfov_deg: float,
+         forward_overlap: float, side_overlap: float) -> list:
+    """Returns the subset of time-sorted photos needed to keep the target overlaps"""
+    if len(photos) < 3 or any(p.dir is None for p in photos):
+        return photos
+    overlap = overlaps(photos, altitude, hfov_deg, vfov_deg)
+
+    kept = [photos[0]]
+    last = 0
+    for i in range(1, len(photos)):
+        if i == len(photos) - 1:
+            kept.append(photos[i])
+            break
+        forward, side = overlap(last, i + 1)
+        if forward < forward_overlap or side < side_overlap:
+            kept.append(photos[i])
+            last = i
+    return kept
+
+
+def synthetic_orbit(frames_per_second: float, radius: float = 800, groundspeed: float = 40) -> list:
+    photos = []
+    lat0, lon0 = 40.0, -105.0
+    n = int(2*math.pi*radius/groundspeed*frames_per_second)
+    for i in range(n):
+        a = 2*math.pi*i/n
+        track = a + math.pi/2
+        photos.append(SimpleNamespace(lat=lat0 + radius*math.cos(a)/DEG_LEN,
+                                      lon=lon0 + radius*math.sin(a)/DEG_LEN/math.cos(math.radians(lat0)),
+                                      dir=np.array([math.cos(track), math.sin(track)]),
+                                      t_utc=i/frames_per_second))
+    return photos
+
+
+if __name__ == "__main__":
+    fps = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    photos = synthetic_orbit(fps)
+    kept = thin(photos, altitude=1000, hfov_deg=50, vfov_deg=40, forward_overlap=0.8, side_overlap=0.6)
+    print(f"{fps} fps orbit: kept {len(kept)} of {len(photos)} frames "
+          f"({100*(1 - len(kept)/len(photos)):.0f}% smaller tar)")
@@ -16,16 +16,91 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from tempfile import mkstemp
 import os
+import sys
+import threading
 import time
-from batcher import Batcher
-from keepalive import KeepAlive
+import traceback
+import env
+from dedup import RecentUploads, copy_and_hash
+from startup import StartupProfiler
 
 app = Flask(__name__)
-batcher = Batcher()
-watchdog = KeepAlive("https://batcher-436396529778.us-west1.run.app", float(os.environ["KEEPALIVE_SECONDS"]))
+profiler = StartupProfiler()
+sampler = None
+if env.PROFILER:
+    from sampler import SamplingProfiler
+    sampler = SamplingProfiler(env.PROFILER_INTERVAL_MS / 1000)
+
+# Batcher and its dependencies (numpy, exifread, google cloud clients) load in
+# the background so the first upload is accepted as soon as Flask is up.
+# Files received before then are handed over once the Batcher exists.
+batcher = None
+watchdog = None
+loaded = threading.Event()
+pending_lock = threading.Lock()
+pending_files: list[str] = []
+uploads_in_flight = 0
+uploads_lock = threading.Lock()
+recent_uploads = RecentUploads(env.DEDUP_CAPACITY)
+
+
+def busy() -> bool:
+    return uploads_in_flight > 0 or (batcher is not None and batcher.has_pending_work())
+
+
+def load() -> None:
+    try:
+        load_batcher()
+    except Exception:
+        # Without a Batcher, uploads would be acknowledged but never
+        # processed. Exit so the instance is replaced and clients retry.
+        traceback.print_exc()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(1)
+
+
+def load_batcher() -> None:
+    global batcher, watchdog
+    for name in ("numpy", "exifread", "cloud_storage", "batcher", "keepalive"):
+        profiler.import_module(name)
+    import cloud_storage
+    from batcher import Batcher
+    from keepalive import KeepAlive
+    with profiler.timed("init Batcher"):
+        new_batcher = Batcher()
+    with profiler.timed("init KeepAlive"):
+        watchdog = KeepAlive("https://batcher-436396529778.us-west1.run.app", float(os.environ["KEEPALIVE_SECONDS"]), busy)
+    with pending_lock:
+        for filepath in pending_files:
+            new_batcher.on_new_file(filepath)
+        pending_files.clear()
+        batcher = new_batcher
+    import metrics
+    metrics.gauge("batcher_duplicate_uploads", "Uploads acknowledged without work because their content was seen recently",
+                  lambda: recent_uploads.duplicates)
+    loaded.set()
+    with profiler.timed("init storage client"):
+        try:
+            cloud_storage.get_client()
+        except Exception as e:
+            print(f"Failed to create storage client: {e}")
+    profiler.print_report()
+
+
+def on_new_file(filepath: str) -> None:
+    with pending_lock:
+        if batcher is None:
+            pending_files.append(filepath)
+            return
+    batcher.on_new_file(filepath)
+    watchdog.poke()
+
+
+threading.Thread(target=load, daemon=True).start()
 
 @app.route("/")
 def hello():
@@ -37,8 +112,48 @@ def keepalive():
     time.sleep(2)
     return ""
 
+@app.route("/startup")
+def startup_profile():
+    return jsonify(profiler.report())
+
+@app.route("/cache")
+def cache_stats():
+    if batcher is None:
+        return jsonify({})
+    return jsonify(batcher.image_cache.stats())
+
+@app.route("/metrics")
+def metrics_text():
+    if batcher is None:
+        return Response("", mimetype="text/plain")
+    import metrics
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/profile")
+def profile():
+    if sampler is None:
+        return jsonify({'error': 'Set PROFILER=1 to enable profiling'}), 404
+    return Response(sampler.collapsed(reset=request.args.get("reset") == "1"), mimetype="text/plain")
+
+@app.route("/stacks")
+def stacks():
+    if sampler is None:
+        return jsonify({'error': 'Set PROFILER=1 to enable profiling'}), 404
+    from sampler import dump_stacks
+    return Response(dump_stacks(), mimetype="text/plain")
+
 @app.route('/image', methods = ['POST'])
 def upload():
+    global uploads_in_flight
+    with uploads_lock:
+        uploads_in_flight += 1
+    try:
+        return receive_image()
+    finally:
+        with uploads_lock:
+            uploads_in_flight -= 1
+
+def receive_image():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part in the request'}), 400
     
@@ -49,8 +164,10 @@ def upload():
 
     fd, filepath = mkstemp(os.path.splitext(file.filename)[1])
     with os.fdopen(fd, 'wb') as f:
-        file.save(f)
-    batcher.on_new_file(filepath)
-    watchdog.poke()
+        digest = copy_and_hash(file.stream, f)
+    if recent_uploads.check(digest):
+        os.remove(filepath)
+        return jsonify({'message': f'File {file.filename} is a duplicate of a recent upload'}), 200
+    on_new_file(filepath)
 
     return jsonify({'message': f'File {file.filename} saved to {filepath}'}), 200
\ No newline at end of file
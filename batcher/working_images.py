@@ -0,0 +1,73 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Converts uploaded JXL images into the images the mosaic job actually works
+# on, while the aircraft is still flying. Decoding JXL is slow, and otherwise
+# happens several times inside the mosaic job after the orbit has closed.
+#
+# imagecodecs and Pillow are imported inside the worker so that they are only
+# loaded in the process pool, and only when WORKING_IMAGES is enabled.
+
+import os
+import struct
+
+
+def read_exif(data: bytes) -> bytes | None:
+    """Returns the TIFF-format EXIF block from a JXL container, if it has one"""
+    if not data.startswith(b"\x00\x00\x00\x0cJXL \r\n\x87\n"):
+        return None  # bare codestream, no metadata boxes
+    pos = 0
+    while pos + 8 <= len(data):
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - pos
+        if box_type == b"Exif":
+            payload = data[pos + header:pos + size]
+            tiff_offset = struct.unpack(">I", payload[:4])[0]
+            return payload[4 + tiff_offset:]
+        pos += size
+    return None
+
+
+def make_working_image(filename: str, max_size: int, fmt: str) -> str:
+    """Decodes a JXL image, downscales it to at most max_size pixels on its long side
+    and writes it next to the original in fmt ("tif" or "jpg"), keeping its EXIF"""
+    import imagecodecs
+    from PIL import Image
+
+    with open(filename, "rb") as f:
+        data = f.read()
+    image = Image.fromarray(imagecodecs.jpegxl_decode(data))
+    if max(image.size) > max_size:
+        scale = max_size / max(image.size)
+        image = image.resize((round(image.width * scale), round(image.height * scale)), Image.Resampling.BILINEAR)
+
+    output = os.path.splitext(filename)[0] + "." + fmt
+    kwargs = {}
+    exif = read_exif(data)
+    if exif is not None:
+        kwargs["exif"] = b"Exif\x00\x00" + exif
+    if fmt == "jpg":
+        image.save(output, format="JPEG", quality=95, **kwargs)
+    else:
+        image.save(output, format="TIFF", **kwargs)
+    return output
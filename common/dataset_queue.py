@@ -0,0 +1,259 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+# Queue of datasets waiting for a long-lived mosaic worker (see worker mode in
+# mosaic.py). Entries are small JSON dicts, normally {"bucket", "dataset"},
+# and are handed out oldest first.
+#
+# An entry lives in one of three folders:
+#   pending/  waiting for a worker
+#   leases/   claimed by a worker, named <expiry ns>-<entry name>
+#   failed/   given up on after max_attempts
+# A worker claims an entry by moving it from pending/ to leases/, and deletes
+# the lease only once the dataset is done. A lease that fails, or that
+# expires because its worker died, goes back to pending/ with its "attempts"
+# count increased. Workers renew their leases while a dataset is running.
+#
+# StorageQueue keeps entries as objects under a prefix of a bucket. It moves
+# an entry by creating the destination with if_generation_match=0 and then
+# deleting the source with a generation precondition, undoing the first step
+# if the second fails, so only one worker wins each move. LocalQueue does the
+# same with files in a directory and os.rename, for local runs and tests.
+
+import json
+import os
+import time
+import uuid
+
+import cloud_storage
+
+PENDING = "pending/"
+LEASES = "leases/"
+FAILED = "failed/"
+
+
+def entry_name() -> str:
+    # Sorts by time of arrival
+    return f"{time.time_ns():020d}-{uuid.uuid4().hex}.json"
+
+
+def lease_name(name: str, lease_seconds: float) -> str:
+    # Sorts by expiry
+    return f"{time.time_ns() + int(lease_seconds * 1e9):020d}-{name}"
+
+
+class Lease:
+    """An entry claimed by a worker until expiry"""
+
+    def __init__(self, entry: dict, name: str) -> None:
+        self.entry = entry
+        self.name = name
+
+    @property
+    def expiry(self) -> float:
+        return int(self.name.partition("-")[0]) / 1e9
+
+    @property
+    def entry_name(self) -> str:
+        return self.name.partition("-")[2]
+
+
+class DatasetQueue:
+    """Lease handling shared by the storage backends.
+
+    Backends provide _list, _read, _create and _delete, and may override
+    _move with something atomic.
+    """
+
+    def __init__(self, max_attempts: int = 3) -> None:
+        self.max_attempts = max_attempts
+
+    def put(self, entry: dict) -> None:
+        self._create(PENDING, entry_name(), json.dumps(entry).encode())
+
+    def get(self, lease_seconds: float) -> Lease | None:
+        """Claims the oldest entry for lease_seconds, or returns None if the queue is empty"""
+        self.requeue_expired()
+        for name in self._list(PENDING):
+            found = self._read(PENDING, name)
+            if found is None:
+                continue  # claimed by another worker
+            data, token = found
+            lease = Lease(json.loads(data), lease_name(name, lease_seconds))
+            if self._move(PENDING, name, token, LEASES, lease.name, data):
+                return lease
+        return None
+
+    def ack(self, lease: Lease) -> None:
+        """Deletes a finished entry"""
+        self._delete(LEASES, lease.name)
+
+    def nack(self, lease: Lease) -> None:
+        """Puts back an entry that failed, or gives up on it after max_attempts"""
+        self._release(lease.name, lease.entry)
+
+    def renew(self, lease: Lease, lease_seconds: float) -> bool:
+        """Extends a lease to lease_seconds from now. Returns False if it was lost"""
+        found = self._read(LEASES, lease.name)
+        if found is None:
+            return False
+        data, token = found
+        name = lease_name(lease.entry_name, lease_seconds)
+        if not self._move(LEASES, lease.name, token, LEASES, name, data):
+            return False
+        lease.name = name
+        return True
+
+    def requeue_expired(self) -> None:
+        now = time.time_ns()
+        for name in self._list(LEASES):
+            if int(name.partition("-")[0]) > now:
+                break
+            found = self._read(LEASES, name)
+            if found is None:
+                continue  # requeued by another worker
+            data, token = found
+            entry = json.loads(data)
+            print(f"Lease on {entry} expired")
+            self._release(name, entry, token)
+
+    def _release(self, name: str, entry: dict, token=None) -> None:
+        entry = dict(entry, attempts=entry.get("attempts", 0) + 1)
+        if entry["attempts"] >= self.max_attempts:
+            print(f"Giving up on {entry} after {entry['attempts']} attempts")
+            folder = FAILED
+        else:
+            folder = PENDING
+        self._move(LEASES, name, token, folder, name.partition("-")[2], json.dumps(entry).encode())
+
+    def _move(self, src_folder: str, src: str, token, dst_folder: str, dst: str, data: bytes) -> bool:
+        """Replaces src with dst holding data. Returns False if src was already moved or changed"""
+        if not self._create(dst_folder, dst, data):
+            return False
+        if not self._delete(src_folder, src, token):
+            self._delete(dst_folder, dst)
+            return False
+        return True
+
+
+class StorageQueue(DatasetQueue):
+    def __init__(self, bucket_name: str, prefix: str, client=None, max_attempts: int = 3) -> None:
+        super().__init__(max_attempts)
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip("/") + "/"
+        self.client = client
+
+    def bucket(self):
+        return (self.client or cloud_storage.get_client()).bucket(self.bucket_name)
+
+    def _list(self, folder: str) -> list[str]:
+        prefix = self.prefix + folder
+        return [blob.name[len(prefix):] for blob in self.bucket().list_blobs(prefix=prefix)]
+
+    def _read(self, folder: str, name: str) -> tuple[bytes, int] | None:
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+
+        blob = self.bucket().get_blob(self.prefix + folder + name)
+        if blob is None:
+            return None
+        try:
+            return blob.download_as_bytes(if_generation_match=blob.generation), blob.generation
+        except (NotFound, PreconditionFailed):
+            return None
+
+    def _create(self, folder: str, name: str, data: bytes) -> bool:
+        from google.api_core.exceptions import PreconditionFailed
+
+        blob = self.bucket().blob(self.prefix + folder + name)
+        try:
+            blob.upload_from_string(data, content_type="application/json", if_generation_match=0)
+        except PreconditionFailed:
+            return False
+        return True
+
+    def _delete(self, folder: str, name: str, generation: int | None = None) -> bool:
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+
+        try:
+            self.bucket().blob(self.prefix + folder + name).delete(if_generation_match=generation)
+        except (NotFound, PreconditionFailed):
+            return False
+        return True
+
+
+class LocalQueue(DatasetQueue):
+    def __init__(self, path: str, max_attempts: int = 3) -> None:
+        super().__init__(max_attempts)
+        self.path = path
+        for folder in (PENDING, LEASES, FAILED):
+            os.makedirs(os.path.join(path, folder), exist_ok=True)
+
+    def _list(self, folder: str) -> list[str]:
+        return sorted(n for n in os.listdir(os.path.join(self.path, folder)) if n.endswith(".json"))
+
+    def _read(self, folder: str, name: str) -> tuple[bytes, None] | None:
+        try:
+            with open(os.path.join(self.path, folder, name), "rb") as f:
+                return f.read(), None
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path: str, data: bytes) -> str:
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        return tmp
+
+    def _create(self, folder: str, name: str, data: bytes) -> bool:
+        path = os.path.join(self.path, folder, name)
+        tmp = self._write(path, data)
+        try:
+            os.link(tmp, path)  # Fails if path exists
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp)
+        return True
+
+    def _delete(self, folder: str, name: str, token=None) -> bool:
+        try:
+            os.remove(os.path.join(self.path, folder, name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _move(self, src_folder: str, src: str, token, dst_folder: str, dst: str, data: bytes) -> bool:
+        src_path = os.path.join(self.path, src_folder, src)
+        tmp = self._write(src_path, data)
+        try:
+            # Claim src first, so nobody else sees the new data before it has moved
+            claimed = tmp + ".claimed"
+            os.rename(src_path, claimed)
+        except FileNotFoundError:
+            os.remove(tmp)
+            return False
+        os.replace(tmp, os.path.join(self.path, dst_folder, dst))
+        os.remove(claimed)
+        return True
+
+
+def open_queue(url: str, max_attempts: int = 3) -> StorageQueue | LocalQueue:
+    """Opens gs://bucket/prefix as a StorageQueue, and anything else as a LocalQueue directory"""
+    if url.startswith("gs://"):
+        bucket_name, _, prefix = url[len("gs://"):].partition("/")
+        return StorageQueue(bucket_name, prefix or "queue", max_attempts=max_attempts)
+    return LocalQueue(url, max_attempts)
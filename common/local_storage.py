@@ -0,0 +1,156 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Local stand-in for the subset of google.cloud.storage used by cloud_storage.
+# Objects are files under a root directory. Every call behaves like a single
+# GCS stream and can be throttled to bytes_per_second, which is what makes
+# parallel transfers faster against the real service.
+#
+# Run this file directly to compare single-stream and parallel transfers:
+#   python local_storage.py [size_mb] [stream_mb_per_second] [workers]
+
+import os
+import sys
+import time
+import tempfile
+import cloud_storage
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+
+class LocalBlob:
+    def __init__(self, bucket: "LocalBucket", name: str) -> None:
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.root, name)
+        self.size = None
+        self.crc32c = None
+        self.generation = None
+
+    def _throttle(self, n: int) -> None:
+        if self.bucket.client.bytes_per_second:
+            time.sleep(n / self.bucket.client.bytes_per_second)
+
+    def _write(self, data: bytes, if_generation_match=None) -> None:
+        if if_generation_match == 0 and os.path.exists(self.path):
+            raise PreconditionFailed(f"{self.name} already exists")
+        self._throttle(len(data))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def upload_from_filename(self, filename: str, if_generation_match=None, **kwargs) -> None:
+        with open(filename, "rb") as f:
+            self._write(f.read(), if_generation_match)
+
+    def upload_from_string(self, data: bytes, if_generation_match=None, **kwargs) -> None:
+        self._write(data, if_generation_match)
+
+    def _check_generation(self, if_generation_match) -> None:
+        try:
+            generation = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            raise NotFound(f"{self.name} not found")
+        if if_generation_match is not None and if_generation_match != generation:
+            raise PreconditionFailed(f"{self.name} has changed")
+
+    def download_as_bytes(self, start: int | None = None, end: int | None = None, if_generation_match=None,
+                          **kwargs) -> bytes:
+        self._check_generation(if_generation_match)
+        with open(self.path, "rb") as f:
+            f.seek(start or 0)
+            data = f.read() if end is None else f.read(end + 1 - (start or 0))
+        self._throttle(len(data))
+        return data
+
+    def compose(self, sources: list["LocalBlob"], if_generation_match=None, **kwargs) -> None:
+        if if_generation_match == 0 and os.path.exists(self.path):
+            raise PreconditionFailed(f"{self.name} already exists")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as f:
+            for source in sources:
+                with open(source.path, "rb") as s:
+                    f.write(s.read())
+
+    def reload(self) -> None:
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.size = len(data)
+        self.crc32c = cloud_storage.crc32c(data)
+        self.generation = os.stat(self.path).st_mtime_ns
+
+    def delete(self, if_generation_match=None, **kwargs) -> None:
+        self._check_generation(if_generation_match)
+        os.remove(self.path)
+
+
+class LocalBucket:
+    def __init__(self, client: "LocalClient", name: str) -> None:
+        self.client = client
+        self.root = os.path.join(client.root, name)
+
+    def blob(self, name: str) -> LocalBlob:
+        return LocalBlob(self, name)
+
+    def get_blob(self, name: str) -> LocalBlob | None:
+        blob = LocalBlob(self, name)
+        if not os.path.exists(blob.path):
+            return None
+        blob.reload()
+        return blob
+
+    def list_blobs(self, prefix: str = "") -> list[LocalBlob]:
+        blobs = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                if name.startswith(prefix):
+                    blobs.append(self.get_blob(name))
+        return sorted(blobs, key=lambda blob: blob.name)
+
+
+class LocalClient:
+    def __init__(self, root: str, bytes_per_second: float | None = None) -> None:
+        self.root = root
+        self.bytes_per_second = bytes_per_second
+
+    def bucket(self, name: str) -> LocalBucket:
+        return LocalBucket(self, name)
+
+
+def benchmark(size_mb: float, stream_mb_per_second: float, workers: int) -> None:
+    with tempfile.TemporaryDirectory() as root:
+        client = LocalClient(root, bytes_per_second=stream_mb_per_second * 1024 * 1024)
+        source = os.path.join(root, "source.tar")
+        with open(source, "wb") as f:
+            f.write(os.urandom(int(size_mb * 1024 * 1024)))
+
+        for n in (1, workers):
+            t0 = time.perf_counter()
+            cloud_storage.upload("bucket", source, f"datasets/{n}.tar", workers=n, threshold=0, client=client)
+            t1 = time.perf_counter()
+            data = cloud_storage.download("bucket", f"datasets/{n}.tar", workers=n, threshold=0, client=client)
+            t2 = time.perf_counter()
+            assert len(data) == os.path.getsize(source)
+            print(f"workers={n}: upload {t1 - t0:.2f} s, download {t2 - t1:.2f} s")
+
+
+if __name__ == "__main__":
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 64
+    stream_mb_per_second = float(sys.argv[2]) if len(sys.argv) > 2 else 32
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else cloud_storage.TRANSFER_WORKERS
+    benchmark(size_mb, stream_mb_per_second, workers)
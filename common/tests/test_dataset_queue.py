@@ -0,0 +1,103 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import time
+
+import pytest
+
+import dataset_queue
+from dataset_queue import FAILED, LEASES, PENDING, LocalQueue, StorageQueue
+from local_storage import LocalClient
+
+
+@pytest.fixture(params=["local", "storage"])
+def queue(request, tmp_path):
+    if request.param == "local":
+        return LocalQueue(str(tmp_path / "queue"), max_attempts=2)
+    return StorageQueue("bucket", "queue", client=LocalClient(str(tmp_path / "storage")), max_attempts=2)
+
+
+def contents(queue, folder: str) -> list[dict]:
+    return [json.loads(queue._read(folder, name)[0]) for name in queue._list(folder)]
+
+
+def test_entries_are_claimed_oldest_first_and_only_once(queue):
+    queue.put({"dataset": "a"})
+    queue.put({"dataset": "b"})
+    first = queue.get(60)
+    second = queue.get(60)
+    assert (first.entry, second.entry) == ({"dataset": "a"}, {"dataset": "b"})
+    assert queue.get(60) is None
+    assert contents(queue, PENDING) == []
+    assert len(queue._list(LEASES)) == 2
+
+
+def test_ack_deletes_the_lease(queue):
+    queue.put({"dataset": "a"})
+    queue.ack(queue.get(60))
+    assert queue._list(LEASES) == []
+    assert queue._list(PENDING) == []
+    assert queue.get(60) is None
+
+
+def test_nack_requeues_then_gives_up(queue):
+    queue.put({"dataset": "a"})
+    queue.nack(queue.get(60))
+    assert contents(queue, PENDING) == [{"dataset": "a", "attempts": 1}]
+    queue.nack(queue.get(60))
+    assert queue._list(PENDING) == []
+    assert queue._list(LEASES) == []
+    assert contents(queue, FAILED) == [{"dataset": "a", "attempts": 2}]
+
+
+def test_expired_lease_is_requeued(queue):
+    queue.put({"dataset": "a"})
+    queue.get(0.01)
+    time.sleep(0.05)
+    lease = queue.get(60)
+    assert lease.entry == {"dataset": "a", "attempts": 1}
+    assert len(queue._list(LEASES)) == 1
+
+
+def test_renew_extends_the_lease(queue):
+    queue.put({"dataset": "a"})
+    lease = queue.get(0.5)
+    name = lease.name
+    assert queue.renew(lease, 60)
+    assert lease.name != name
+    assert lease.expiry > time.time() + 50
+    assert queue._list(LEASES) == [lease.name]
+    time.sleep(0.6)
+    # The original expiry has passed, but the renewed lease holds
+    assert queue.get(60) is None
+    queue.ack(lease)
+    assert queue._list(LEASES) == []
+
+
+def test_lost_lease_cannot_be_renewed(queue):
+    queue.put({"dataset": "a"})
+    lease = queue.get(0.01)
+    time.sleep(0.05)
+    other = queue.get(60)  # Requeues the expired lease and claims it again
+    assert not queue.renew(lease, 60)
+    assert queue._list(LEASES) == [other.name]
+
+
+def test_open_queue():
+    assert isinstance(dataset_queue.open_queue("gs://bucket/prefix"), StorageQueue)
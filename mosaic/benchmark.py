@@ -0,0 +1,152 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Benchmark of the mosaic pipeline on a fixed set of local datasets.
+#
+# Each dataset is processed in local mode (no BUCKET) in a fresh interpreter,
+# so nothing is warm and peak memory is measured per run. Per-step seconds
+# are the median over --repeat runs, peak memory (including ODM's
+# subprocesses) is the maximum, and the output size is that of the mosaic.
+#
+#   python3 benchmark.py /datasets/bench/*.tar --baseline /datasets/bench/baseline.json
+#
+# exits with 1 if any measurement is worse than the baseline by more than its
+# tolerance. --write-baseline saves the results as the new baseline instead.
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Allowed relative change from the baseline before it counts as a regression,
+# plus an absolute slack so that steps taking a fraction of a second don't
+# flag on noise. Timings are noisy; memory and output size should barely move.
+DEFAULT_TOLERANCES = {"seconds": 0.15, "seconds_slack": 1.0,
+                      "peak_rss_mb": 0.10, "peak_rss_mb_slack": 32,
+                      "output_bytes": 0.02, "output_bytes_slack": 0}
+
+
+def run_one(dataset: str) -> dict:
+    """Processes one dataset in this process and returns its measurements"""
+    import mosaic
+
+    work_dir = tempfile.mkdtemp(prefix="mosaic-benchmark-")
+    try:
+        # The mosaic is written next to the dataset in local mode
+        local_dataset = os.path.join(work_dir, os.path.basename(dataset))
+        shutil.copyfile(dataset, local_dataset)
+        timings = {}
+        t = time.perf_counter()
+        retcode = mosaic.process_dataset(None, local_dataset, os.path.join(work_dir, "dataset"), timings=timings)
+        timings["total"] = time.perf_counter() - t
+        output = os.path.splitext(local_dataset)[0] + ".tiff"
+        # ru_maxrss is in KB on Linux
+        peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        return {"retcode": retcode,
+                "seconds": timings,
+                "peak_rss_mb": peak_kb / 1024,
+                "output_bytes": os.path.getsize(output) if os.path.exists(output) else 0}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def measure(dataset: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--one", dataset],
+                             stdout=subprocess.PIPE, text=True, check=True).stdout
+        # ODM logs to stdout too; the measurements are the last line
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    failed = [r["retcode"] for r in runs if r["retcode"] != 0]
+    if failed:
+        raise RuntimeError(f"{dataset} failed with return code {failed[0]}")
+    steps = runs[0]["seconds"].keys()
+    return {"seconds": {step: statistics.median(r["seconds"][step] for r in runs) for step in steps},
+            "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+            "output_bytes": runs[-1]["output_bytes"]}
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """Returns a description of every regression against the baseline"""
+    tolerances = dict(DEFAULT_TOLERANCES, **baseline.get("tolerances", {}))
+    regressions = []
+    for name, result in results.items():
+        expected = baseline["datasets"].get(name)
+        if expected is None:
+            print(f"{name}: not in baseline")
+            continue
+        checks = [(f"seconds.{step}", "seconds", result["seconds"].get(step), expected["seconds"][step], False)
+                  for step in expected["seconds"]]
+        checks.append(("peak_rss_mb", "peak_rss_mb", result["peak_rss_mb"], expected["peak_rss_mb"], False))
+        # A mosaic that changes size either way means the output changed
+        checks.append(("output_bytes", "output_bytes", result["output_bytes"], expected["output_bytes"], True))
+        for metric, kind, value, base, both_ways in checks:
+            if value is None:
+                regressions.append(f"{name}: {metric} missing")
+                continue
+            tolerance = tolerances[kind]
+            allowed = base*tolerance + tolerances[kind + "_slack"]
+            change = (value - base) / base if base else 0.0
+            worse = abs(value - base) > allowed if both_ways else value - base > allowed
+            print(f"{name}: {metric} {value:.6g} vs {base:.6g} ({change:+.1%}){'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{name}: {metric} {change:+.1%} (tolerance {tolerance:.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("datasets", nargs="*", help="dataset tars to process")
+    parser.add_argument("--baseline", help="baseline JSON to compare against or write")
+    parser.add_argument("--write-baseline", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per dataset")
+    parser.add_argument("--one", help=argparse.SUPPRESS)
+    # ODM parses sys.argv when its options are loaded
+    args, sys.argv[1:] = parser.parse_known_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one)))
+        return 0
+
+    results = {os.path.basename(d): measure(d, args.repeat) for d in args.datasets}
+    print(json.dumps(results, indent=2))
+    if not args.baseline:
+        return 0
+    if args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"tolerances": DEFAULT_TOLERANCES, "datasets": results}, f, indent=2)
+        print(f"Wrote baseline to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+
+from opendm import log
+from opendm.osfm import OSFMContext
+
+PAIRS_FILE = "candidate_pairs.json"
+
+
+class PairsOSFMContext(OSFMContext):
+    """OSFMContext that matches only the candidate pairs Batcher shipped in the dataset, if any"""
+
+    def run(self, command):
+        pairs_path = os.path.join(self.opensfm_project_path, PAIRS_FILE)
+        if command == "match_features" and os.path.exists(pairs_path):
+            match_candidate_pairs(self.opensfm_project_path, pairs_path)
+        else:
+            super().run(command)
+
+
+def match_candidate_pairs(opensfm_project_path: str, pairs_path: str) -> None:
+    from opensfm import dataset, matching
+
+    data = dataset.DataSet(opensfm_project_path)
+    images = data.images()
+    names = set(images)
+    with open(pairs_path) as f:
+        pairs = [(a, b) for a, b in json.load(f) if a in names and b in names]
+    exifs = {image: data.load_exif(image) for image in images}
+    log.ODM_INFO(f"Matching {len(pairs)} candidate pairs from {PAIRS_FILE}")
+
+    matches = matching.match_images_with_pairs(data, {}, exifs, pairs)
+    matching.save_matches(data, images, matches)
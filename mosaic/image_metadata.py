@@ -0,0 +1,83 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Batcher ships the per-image fields it already parsed in image_metadata.json.
+# ODMLoadDatasetStage skips EXIF extraction when the project already has an
+# images.json database, so one is written here from that file. Fields that
+# are the same for every image of a camera (size, make, model, focal length)
+# come from parsing a single image per file type; that image's other fields
+# (speed, GPS accuracy, attitude, exposure, ...) are cleared rather than
+# copied to every image.
+
+import copy
+import json
+import os
+
+from opendm import log
+from opendm.photo import ODM_Photo
+
+METADATA_FILE = "image_metadata.json"
+
+# ODM_Photo fields shared by every image from the same camera
+CAMERA_FIELDS = {"width", "height", "exif_width", "exif_height", "camera_make", "camera_model", "orientation",
+                 "band_name", "band_index", "bits_per_sample", "fnumber", "focal_ratio", "camera_projection",
+                 "radiometric_calibration", "black_level", "vignetting_center", "vignetting_polynomial",
+                 "center_wavelength", "bandwidth"}
+
+
+def camera_template(path: str) -> ODM_Photo:
+    """Parses one image, keeping only the fields that hold for every image from its camera"""
+    template = ODM_Photo(path)
+    for name in vars(template):
+        if name not in CAMERA_FIELDS:
+            setattr(template, name, None)
+    return template
+
+
+def write_images_database(project_path: str) -> bool:
+    """Writes images.json for the project from Batcher's metadata. Returns False if there is none"""
+    metadata_path = os.path.join(project_path, METADATA_FILE)
+    images_dir = os.path.join(project_path, "images")
+    database_path = os.path.join(project_path, "images.json")
+    if not os.path.exists(metadata_path) or os.path.exists(database_path):
+        return False
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+
+    templates = {}
+    photos = []
+    for filename in sorted(os.listdir(images_dir)):
+        if filename not in metadata:
+            log.ODM_WARNING(f"No metadata for {filename}, parsing EXIF for all images")
+            return False
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in templates:
+            templates[ext] = camera_template(os.path.join(images_dir, filename))
+        photo = copy.copy(templates[ext])
+        photo.filename = filename
+        photo.latitude = metadata[filename]["latitude"]
+        photo.longitude = metadata[filename]["longitude"]
+        photo.altitude = metadata[filename]["altitude"]
+        photo.utc_time = metadata[filename]["utc_time"] * 1000
+        photos.append(photo)
+
+    with open(database_path, "w") as f:
+        json.dump([p.__dict__ for p in photos], f)
+    log.ODM_INFO(f"Wrote {database_path} for {len(photos)} images from {METADATA_FILE}")
+    return True
@@ -17,6 +17,7 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import time
 import traceback
 import sys
 
@@ -31,6 +32,11 @@ from stages.run_opensfm import ODMOpenSfMStage
 from stages.odm_filterpoints import ODMFilterPoints
 from stages.dem2mosaic import DEM2Mosaic
 from opendm.arghelpers import args_to_dict, save_opts, find_rerun_stage
+import stages.run_opensfm
+from candidate_pairs import PairsOSFMContext
+
+# Restrict feature matching to the candidate pairs in the dataset, when present
+stages.run_opensfm.OSFMContext = PairsOSFMContext
 
 
 class LightningOrtho:
@@ -55,6 +61,20 @@ class LightningOrtho:
 
         dataset.connect(opensfm).connect(filterpoints).connect(dem2mosaic)
 
+        # Seconds spent in each stage, for benchmark.py
+        self.stage_seconds = {}
+        for stage in (dataset, opensfm, filterpoints, dem2mosaic):
+            stage.process = self.timed(stage.name, stage.process)
+
+    def timed(self, name, process):
+        def timed_process(args, outputs):
+            t = time.perf_counter()
+            try:
+                return process(args, outputs)
+            finally:
+                self.stage_seconds[name] = time.perf_counter() - t
+        return timed_process
+
     def execute(self, outputs):
         try:
             self.first_stage.run(outputs)
@@ -16,51 +16,203 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+# Runs once per dataset by default, on the dataset named by BUCKET and DATASET.
+#
+# With QUEUE set, runs as a long-lived worker instead: it takes datasets from
+# the queue (see dataset_queue.py) and processes up to WORKER_CONCURRENCY of
+# them at a time, so orbits that close in quick succession don't each pay for
+# a container start and the ODM imports. It exits after WORKER_IDLE_SECONDS
+# with nothing to do.
+
+import copy
 import io
+import json
+import multiprocessing as mp
 import os
 import shutil
 import tarfile
+import tempfile
+import time
+import traceback
 import cloud_storage
+import dataset_queue
+import image_metadata
 
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from opendm import config
 from lightning_ortho import LightningOrtho
+from candidate_pairs import PAIRS_FILE
 
+WORKER_POLL_SECONDS = 2
 
-def main():
-    bucket_name = os.getenv("BUCKET")
-    dataset_name = os.getenv("DATASET", "/datasets/test.tar")
-    if bucket_name:
-        print(f"Downloading {dataset_name} from {bucket_name}")
-        dataset_archive = cloud_storage.download(bucket_name=bucket_name, remote_blob_name=dataset_name)
-    else:
-        with open(dataset_name, "rb") as f:
-            dataset_archive = f.read()
-
-    dataset_dir = "/dataset"
+_args = None
+
+
+def base_args():
+    """ODM options shared by every dataset, parsed once per process"""
+    global _args
+    if _args is None:
+        _args = config.config()
+        _args.fast_orthophoto = True
+        _args.feature_threshold_scale = 1
+        _args.ignore_ypr = True
+    return _args
+
+
+def extract_datasets(bucket_name: str | None, dataset_names: list[str], dataset_dir: str) -> None:
+    """Extracts one or more datasets into a single project"""
     os.mkdir(dataset_dir)
-    with tarfile.open(fileobj=io.BytesIO(dataset_archive), mode="r") as tar:
-        tar.extractall(path=dataset_dir)
+    metadata = {}
+    for dataset_name in dataset_names:
+        if bucket_name:
+            print(f"Downloading {dataset_name} from {bucket_name}")
+            dataset_archive = cloud_storage.download(bucket_name=bucket_name, remote_blob_name=dataset_name)
+        else:
+            with open(dataset_name, "rb") as f:
+                dataset_archive = f.read()
+        with tarfile.open(fileobj=io.BytesIO(dataset_archive), mode="r") as tar:
+            tar.extractall(path=dataset_dir)
+        metadata_path = os.path.join(dataset_dir, image_metadata.METADATA_FILE)
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata.update(json.load(f))
+
+    if len(dataset_names) > 1:
+        # Each dataset's metadata overwrote the last one's, and its candidate
+        # pairs never cross into the other datasets
+        if metadata:
+            with open(os.path.join(dataset_dir, image_metadata.METADATA_FILE), "w") as f:
+                json.dump(metadata, f)
+        pairs_path = os.path.join(dataset_dir, "opensfm", PAIRS_FILE)
+        if os.path.exists(pairs_path):
+            os.remove(pairs_path)
+        print(f"Mosaicking {len(dataset_names)} datasets together")
+
 
-    args = config.config()
+def process_dataset(bucket_name: str | None, dataset_name: str, dataset_dir: str, max_concurrency: int | None = None,
+                    timings: dict | None = None) -> int:
+    """Mosaics a dataset, or several comma-separated datasets together. Without a bucket,
+    datasets are local files and the mosaic is written next to them. Returns ODM's return code.
+    Seconds spent in each step are added to timings, if given"""
+    timings = {} if timings is None else timings
+    t = time.perf_counter()
+    dataset_names = dataset_name.split(",")
+    extract_datasets(bucket_name, dataset_names, dataset_dir)
+    image_metadata.write_images_database(dataset_dir)
+    timings["extract"] = time.perf_counter() - t
+
+    args = copy.copy(base_args())
     args.project_path = dataset_dir
-    args.fast_orthophoto = True
-    args.feature_threshold_scale = 1
-    args.ignore_ypr = True
+    if max_concurrency:
+        args.max_concurrency = max_concurrency
 
     app = LightningOrtho(args)
     outputs = {}
     retcode = app.execute(outputs)
+    timings.update(app.stage_seconds)
 
+    t = time.perf_counter()
     if retcode == 0:
         mosaic_file = os.path.join(outputs["tree"].odm_meshing, "mosaic.tiff")
-        if bucket_name:
-            output_name = os.path.splitext(dataset_name)[0] + ".tiff"
-            cloud_storage.upload(bucket_name, mosaic_file, output_name)
-            print(f"Uploaded {output_name} to {bucket_name}")
-        else:
-            shutil.copyfile(mosaic_file, "/datasets/test.tiff")
+        # Every dataset gets its mosaic under its own name, even when coalesced
+        for name in dataset_names:
+            output_name = os.path.splitext(name)[0] + ".tiff"
+            if bucket_name:
+                cloud_storage.upload(bucket_name, mosaic_file, output_name)
+                print(f"Uploaded {output_name} to {bucket_name}")
+            else:
+                shutil.copyfile(mosaic_file, output_name)
         print("SUCCESS!")
-    else:
+    timings["output"] = time.perf_counter() - t
+    return retcode
+
+
+def worker_task(entry: dict, work_root: str, max_concurrency: int) -> int:
+    dataset_dir = os.path.join(tempfile.mkdtemp(dir=work_root), "dataset")
+    try:
+        return process_dataset(entry.get("bucket"), entry["dataset"], dataset_dir, max_concurrency)
+    finally:
+        shutil.rmtree(os.path.dirname(dataset_dir), ignore_errors=True)
+
+
+def worker(queue, concurrency: int, idle_seconds: float, lease_seconds: float) -> None:
+    # The pool processes are forked from this one after ODM is imported and
+    # the options are parsed, and are reused for every dataset. Cores are
+    # split between datasets running at the same time.
+    base_args()
+    max_concurrency = max(1, (os.cpu_count() or 1) // concurrency)
+    work_root = tempfile.mkdtemp(prefix="mosaic-worker-")
+    new_executor = lambda: ProcessPoolExecutor(concurrency, mp_context=mp.get_context("fork"))
+    executor = new_executor()
+    running: dict[Future, dataset_queue.Lease] = {}
+    idle_since = time.monotonic()
+    print(f"Mosaic worker running {concurrency} datasets at a time with {max_concurrency} cores each")
+
+    while True:
+        while len(running) < concurrency:
+            lease = queue.get(lease_seconds)
+            if lease is None:
+                break
+            print(f"Starting {lease.entry}")
+            try:
+                try:
+                    future = executor.submit(worker_task, lease.entry, work_root, max_concurrency)
+                except BrokenProcessPool:
+                    # A pool process died (e.g. killed for running out of
+                    # memory), which fails every running dataset and breaks
+                    # the pool. Those datasets are put back below.
+                    print("Process pool is broken, starting a new one")
+                    executor.shutdown(wait=False)
+                    executor = new_executor()
+                    future = executor.submit(worker_task, lease.entry, work_root, max_concurrency)
+            except BaseException:
+                queue.nack(lease)
+                raise
+            running[future] = lease
+
+        for future in [f for f in running if f.done()]:
+            lease = running.pop(future)
+            try:
+                retcode = future.result()
+                print(f"Finished {lease.entry} with return code {retcode}")
+            except BaseException:
+                retcode = None
+                print(f"Failed {lease.entry}: {traceback.format_exc()}")
+            # The entry is only dropped once its dataset is done
+            if retcode == 0:
+                queue.ack(lease)
+            else:
+                queue.nack(lease)
+
+        for lease in running.values():
+            if lease.expiry - time.time() < lease_seconds / 2 and not queue.renew(lease, lease_seconds):
+                print(f"Lost the lease on {lease.entry}")
+
+        if running:
+            idle_since = time.monotonic()
+            if len(running) == concurrency:
+                wait(running, timeout=WORKER_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                continue
+        elif time.monotonic() - idle_since > idle_seconds:
+            print(f"No datasets for {idle_seconds} seconds, exiting")
+            break
+        time.sleep(WORKER_POLL_SECONDS)
+
+    executor.shutdown()
+    shutil.rmtree(work_root, ignore_errors=True)
+
+
+def main():
+    queue_url = os.getenv("QUEUE")
+    if queue_url:
+        queue = dataset_queue.open_queue(queue_url, int(os.getenv("QUEUE_MAX_ATTEMPTS", 3)))
+        worker(queue, int(os.getenv("WORKER_CONCURRENCY", 2)), float(os.getenv("WORKER_IDLE_SECONDS", 300)),
+               float(os.getenv("WORKER_LEASE_SECONDS", 600)))
+        return
+
+    retcode = process_dataset(os.getenv("BUCKET"), os.getenv("DATASET", "/datasets/test.tar"), "/dataset")
+    if retcode != 0:
         exit(retcode)
 
 
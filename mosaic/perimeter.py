@@ -21,6 +21,7 @@ import rasterio.warp
 import numpy as np
 import numpy.typing as npt
 from skimage import measure, morphology
+from scipy import ndimage
 from scipy.ndimage import binary_fill_holes
 from shapely.geometry import Polygon, Point, MultiPoint
 from shapely.ops import unary_union
@@ -38,20 +39,76 @@ threshold_value = 128
 perimeter_output = "/mnt/c/Users/natha/Downloads/perimeter.kml"
 active_output = "/mnt/c/Users/natha/Downloads/active.kml"
 current_month_kml_name = "current_month.kml"
+# Find fire on an overview this many times smaller and only dilate and
+# contour around it at full resolution (1 = whole image at full resolution)
+coarse_factor = 8
 # -----------------------------------------
 
 
-def make_polygons(binary_img: npt.NDArray, buffer_dist, dilate_radius, keep_points: bool) -> gpd.GeoDataFrame:
+def fire_windows(binary_img: npt.NDArray, factor: int, dilate_radius: int) -> list[tuple[int, int, npt.NDArray]]:
+    """Splits binary_img into windows around groups of fire pixels, found on an overview
+    factor times smaller. Returns the row and column offset of each window and its fire pixels.
+
+    Fire pixels close enough for their dilations to touch always end up in the same group,
+    and each window reaches more than dilate_radius past its group's pixels while only
+    holding that group's pixels. Dilating, filling and contouring each window separately
+    therefore gives the same contours as doing it on the whole image, except for groups
+    lying inside a hole of another group's dilation, which filling the whole image covers
+    over (see fire_contours).
+    """
+    h, w = binary_img.shape
+    ch, cw = -(-h // factor), -(-w // factor)
+    padded = np.zeros((ch * factor, cw * factor), dtype=bool)
+    padded[:h, :w] = binary_img
+    overview = padded.reshape(ch, factor, cw, factor).any(axis=(1, 3))
+
+    reach = -(-dilate_radius // factor) + 1
+    groups, _ = ndimage.label(ndimage.binary_dilation(overview, np.ones((2 * reach + 1, 2 * reach + 1), dtype=bool)))
+    windows = []
+    for label, (rows, cols) in enumerate(ndimage.find_objects(groups), start=1):
+        r0, r1 = rows.start * factor, min(rows.stop * factor, h)
+        c0, c1 = cols.start * factor, min(cols.stop * factor, w)
+        own = np.kron(groups[rows, cols] == label, np.ones((factor, factor), dtype=bool))
+        windows.append((r0, c0, binary_img[r0:r1, c0:c1] & own[:r1 - r0, :c1 - c0]))
+    return windows
+
+
+def fire_contours(binary_img: npt.NDArray, dilate_radius: int, coarse_factor: int = 1) -> list[npt.NDArray]:
+    """Contours, in image pixel coordinates, of the dilated and hole-filled fire regions"""
+    if coarse_factor > 1:
+        windows = fire_windows(binary_img, coarse_factor, dilate_radius)
+    else:
+        windows = [(0, 0, binary_img)]
+
+    filled = []
+    for row_offset, col_offset, window in windows:
+        dilate1 = morphology.binary_dilation(window, morphology.disk(dilate_radius))
+        filled.append((row_offset, col_offset, window, binary_fill_holes(dilate1)))
+
+    contours = []
+    for i, (row_offset, col_offset, window, dilate1) in enumerate(filled):
+        fire = np.argwhere(window)
+        if len(fire) == 0:
+            continue
+        # A group whose dilation doesn't touch another's lies either wholly outside it or
+        # wholly inside one of its holes, where the whole image would have been filled over
+        r, c = fire[0] + (row_offset, col_offset)
+        if any(j != i and 0 <= r - r0 < other.shape[0] and 0 <= c - c0 < other.shape[1] and other[r - r0, c - c0]
+               for j, (r0, c0, _, other) in enumerate(filled)):
+            continue
+
+        # EXTRACT BLOBS → POLYGONS
+        # Find connected components and extract contours
+        for contour in measure.find_contours(dilate1, level=0.5):
+            contours.append(contour + (row_offset, col_offset))
+    return contours
 
-    dilate1 = morphology.binary_dilation(binary_img, morphology.disk(dilate_radius))
-    dilate1 = binary_fill_holes(dilate1)
 
-    # EXTRACT BLOBS → POLYGONS
-    # Find connected components and extract contours
-    contours = measure.find_contours(dilate1, level=0.5)
+def make_polygons(binary_img: npt.NDArray, buffer_dist, dilate_radius, keep_points: bool,
+                  coarse_factor: int = 1) -> gpd.GeoDataFrame:
 
     polygons = []
-    for contour in contours:
+    for contour in fire_contours(binary_img, dilate_radius, coarse_factor):
         # Convert pixel coordinates to spatial coordinates
         coords = []
         for r, c in contour:
@@ -139,70 +196,71 @@ def make_bbox_placemark(bbox: rasterio.coords.BoundingBox):
                          KML.styleUrl("boundsStyle"))
 
 
-with rasterio.open(tiff_path) as src:
-    img = src.read(1)
-    transform = src.transform
-    crs = src.crs
-    l, b, r, t = rasterio.warp.transform_bounds(crs, rasterio.crs.CRS.from_epsg(4326), src.bounds.left, src.bounds.bottom, src.bounds.right, src.bounds.top)
-    bounds = rasterio.coords.BoundingBox(l, b, r, t)
-    timestr_tiff = src.tags().get("TIFFTAG_DATETIME")
-    timestr = timestr_tiff.replace(" ", "_").replace(":", "-")
-    timestr_kml = timestr_tiff.replace(" ", "T").replace(":", "-", 2)
-
-binary = img > threshold_value
-
-perimeter = make_polygons(binary, buffer_dist=-0.0005, dilate_radius=10, keep_points=False)
-perimeter.to_file(perimeter_output, driver="KML")
-active = make_polygons(binary, buffer_dist=-0.0002, dilate_radius=4, keep_points=True)
-active.to_file(active_output, driver="KML")
-
-centroid = perimeter.geometry.centroid.to_crs(4326)
-incident_name = pgh.encode(centroid.y[0], centroid.x[0], precision=8)
-output_file = f"{incident_name}_{timestr}.kml"
-
-combine_kmls(perimeter_output, active_output, timestr_kml, output_file)
-
-try:
-    with open(current_month_kml_name) as f:
-        current_month_kml = parser.parse(f).getroot()
-except FileNotFoundError:
-    current_month_kml = KML.kml(KML.Document(KML.Style(KML.LineStyle(KML.color("ffaaaaaa"),
-                                                                     KML.width(4)),
-                                                       KML.PolyStyle(KML.color("55555555"),
-                                                                     KML.fill(0),
-                                                                     KML.outline(1)),
-                                                       id="boundsStyle")))
-
-
-new_view_network_link = KML.NetworkLink(KML.Link(KML.href(output_file)),
-                                        KML.name(timestr_tiff))
-
-found_match = False
-for region in current_month_kml.Document.findall('.//{http://www.opengis.net/kml/2.2}Region'):
-    lla_box = region.find('{http://www.opengis.net/kml/2.2}LatLonAltBox')
-    existing_bbox = rasterio.coords.BoundingBox(left=lla_box.find('{http://www.opengis.net/kml/2.2}west'),
-                                                bottom=lla_box.find('{http://www.opengis.net/kml/2.2}south'),
-                                                right=lla_box.find('{http://www.opengis.net/kml/2.2}east'),
-                                                top=lla_box.find('{http://www.opengis.net/kml/2.2}north'))
-    if do_bboxes_intersect(bounds, existing_bbox):
-        found_match = True
-        new_bbox = bbox_union(bounds, existing_bbox)
-        lla_box.west = new_bbox.left
-        lla_box.south = new_bbox.bottom
-        lla_box.east = new_bbox.right
-        lla_box.north = new_bbox.top
-        region.getparent().Placemark = make_bbox_placemark(new_bbox)
-        region.getparent().append(new_view_network_link)
-        break
-
-if not found_match:
-    current_month_kml.Document.append(KML.Folder(KML.name(incident_name),
-                                                 make_bbox_placemark(bounds),
-                                                 KML.Region(KML.LatLonAltBox(KML.north(bounds.top),
-                                                                             KML.south(bounds.bottom),
-                                                                             KML.east(bounds.right),
-                                                                             KML.west(bounds.left))),
-                                                 new_view_network_link))
-
-with open(current_month_kml_name, "wb") as f:
-    f.write(etree.tostring(current_month_kml, pretty_print=True))
+if __name__ == "__main__":
+    with rasterio.open(tiff_path) as src:
+        img = src.read(1)
+        transform = src.transform
+        crs = src.crs
+        l, b, r, t = rasterio.warp.transform_bounds(crs, rasterio.crs.CRS.from_epsg(4326), src.bounds.left, src.bounds.bottom, src.bounds.right, src.bounds.top)
+        bounds = rasterio.coords.BoundingBox(l, b, r, t)
+        timestr_tiff = src.tags().get("TIFFTAG_DATETIME")
+        timestr = timestr_tiff.replace(" ", "_").replace(":", "-")
+        timestr_kml = timestr_tiff.replace(" ", "T").replace(":", "-", 2)
+
+    binary = img > threshold_value
+
+    perimeter = make_polygons(binary, buffer_dist=-0.0005, dilate_radius=10, keep_points=False, coarse_factor=coarse_factor)
+    perimeter.to_file(perimeter_output, driver="KML")
+    active = make_polygons(binary, buffer_dist=-0.0002, dilate_radius=4, keep_points=True, coarse_factor=coarse_factor)
+    active.to_file(active_output, driver="KML")
+
+    centroid = perimeter.geometry.centroid.to_crs(4326)
+    incident_name = pgh.encode(centroid.y[0], centroid.x[0], precision=8)
+    output_file = f"{incident_name}_{timestr}.kml"
+
+    combine_kmls(perimeter_output, active_output, timestr_kml, output_file)
+
+    try:
+        with open(current_month_kml_name) as f:
+            current_month_kml = parser.parse(f).getroot()
+    except FileNotFoundError:
+        current_month_kml = KML.kml(KML.Document(KML.Style(KML.LineStyle(KML.color("ffaaaaaa"),
+                                                                         KML.width(4)),
+                                                           KML.PolyStyle(KML.color("55555555"),
+                                                                         KML.fill(0),
+                                                                         KML.outline(1)),
+                                                           id="boundsStyle")))
+
+
+    new_view_network_link = KML.NetworkLink(KML.Link(KML.href(output_file)),
+                                            KML.name(timestr_tiff))
+
+    found_match = False
+    for region in current_month_kml.Document.findall('.//{http://www.opengis.net/kml/2.2}Region'):
+        lla_box = region.find('{http://www.opengis.net/kml/2.2}LatLonAltBox')
+        existing_bbox = rasterio.coords.BoundingBox(left=lla_box.find('{http://www.opengis.net/kml/2.2}west'),
+                                                    bottom=lla_box.find('{http://www.opengis.net/kml/2.2}south'),
+                                                    right=lla_box.find('{http://www.opengis.net/kml/2.2}east'),
+                                                    top=lla_box.find('{http://www.opengis.net/kml/2.2}north'))
+        if do_bboxes_intersect(bounds, existing_bbox):
+            found_match = True
+            new_bbox = bbox_union(bounds, existing_bbox)
+            lla_box.west = new_bbox.left
+            lla_box.south = new_bbox.bottom
+            lla_box.east = new_bbox.right
+            lla_box.north = new_bbox.top
+            region.getparent().Placemark = make_bbox_placemark(new_bbox)
+            region.getparent().append(new_view_network_link)
+            break
+
+    if not found_match:
+        current_month_kml.Document.append(KML.Folder(KML.name(incident_name),
+                                                     make_bbox_placemark(bounds),
+                                                     KML.Region(KML.LatLonAltBox(KML.north(bounds.top),
+                                                                                 KML.south(bounds.bottom),
+                                                                                 KML.east(bounds.right),
+                                                                                 KML.west(bounds.left))),
+                                                     new_view_network_link))
+
+    with open(current_month_kml_name, "wb") as f:
+        f.write(etree.tostring(current_month_kml, pretty_print=True))
@@ -0,0 +1,67 @@
+# Copyright (c) 2025-2026 Lab 308, LLC.
+
+# This file is part of automosaic
+# (see ${https://github.com/NathanMOlson/automosaic}).
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+
+pytest.importorskip("geopandas")
+from perimeter import fire_contours
+
+
+def contour_keys(contours: list[np.ndarray]) -> list[tuple]:
+    return sorted((len(c), round(c[:, 0].sum(), 6), round(c[:, 1].sum(), 6)) for c in contours)
+
+
+def random_fire(rng: np.random.Generator) -> np.ndarray:
+    h, w = rng.integers(50, 400, 2)
+    img = np.zeros((h, w), dtype=bool)
+    for _ in range(rng.integers(0, 12)):
+        y, x = rng.integers(0, h), rng.integers(0, w)
+        s = rng.integers(1, 15)
+        patch = img[max(y - s, 0):y + s, max(x - s, 0):x + s]
+        patch |= rng.random(patch.shape) > 0.6
+    # A ring, so that hole filling matters
+    yy, xx = np.ogrid[:h, :w]
+    img |= np.abs(np.hypot(yy - rng.integers(0, h), xx - rng.integers(0, w)) - 30) < 1
+    return img
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_coarse_contours_match_full_resolution(seed):
+    img = random_fire(np.random.default_rng(seed))
+    for dilate_radius in (4, 10):
+        full = contour_keys(fire_contours(img, dilate_radius))
+        for coarse_factor in (2, 4, 8, 16):
+            assert contour_keys(fire_contours(img, dilate_radius, coarse_factor)) == full
+
+
+def test_hotspot_inside_ring_is_filled_over():
+    # The hotspot is more than 2 * dilate_radius from the ring, so it falls in a window of its own
+    yy, xx = np.ogrid[:300, :300]
+    img = np.abs(np.hypot(yy - 150, xx - 150) - 100) < 1
+    img[150, 150] = True
+    full = fire_contours(img, 4)
+    assert len(full) == 1
+    for coarse_factor in (2, 4, 8, 16):
+        assert contour_keys(fire_contours(img, 4, coarse_factor)) == contour_keys(full)
+
+
+def test_no_fire():
+    img = np.zeros((64, 64), dtype=bool)
+    assert fire_contours(img, 4) == []
+    assert fire_contours(img, 4, 8) == []